@@ -0,0 +1,51 @@
+"""Store completion duration in seconds
+
+Revision ID: f03b7d9c2e85
+Revises: c6b0e2f7a914
+Create Date: 2024-10-15 16:12:40.382561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f03b7d9c2e85'
+down_revision = 'c6b0e2f7a914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('projectcompletion', sa.Column('duration_seconds', sa.Integer(), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        duration = (
+            'CAST(EXTRACT(EPOCH FROM close_date - create_date) AS INTEGER)'
+        )
+    else:
+        duration = (
+            'CAST(ROUND((julianday(close_date) - julianday(create_date)) '
+            '* 86400) AS INTEGER)'
+        )
+    op.execute(
+        f'UPDATE projectcompletion SET duration_seconds = ('
+        f'SELECT {duration} FROM charityproject '
+        'WHERE charityproject.id = projectcompletion.project_id)'
+    )
+    with op.batch_alter_table('projectcompletion') as batch_op:
+        batch_op.drop_index('ix_projectcompletion_duration_days')
+        batch_op.drop_column('duration_days')
+        batch_op.alter_column('duration_seconds', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_projectcompletion_duration_seconds'), ['duration_seconds'], unique=False)
+
+
+def downgrade():
+    op.add_column('projectcompletion', sa.Column('duration_days', sa.Float(), nullable=True))
+    op.execute(
+        'UPDATE projectcompletion SET duration_days = duration_seconds / 86400.0'
+    )
+    with op.batch_alter_table('projectcompletion') as batch_op:
+        batch_op.drop_index('ix_projectcompletion_duration_seconds')
+        batch_op.drop_column('duration_seconds')
+        batch_op.alter_column('duration_days', existing_type=sa.Float(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_projectcompletion_duration_days'), ['duration_days'], unique=False)
@@ -1,4 +1,5 @@
 from .charity_project import router as project_router  # noqa
 from .donation import router as donation_router  # noqa
 from .users import router as user_router  # noqa
-from .google_api import router as google_api_router # noqa
\ No newline at end of file
+from .google_api import router as google_api_router # noqa
+from .reports import router as reports_router  # noqa
@@ -1,17 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.validators import (
-    check_full_amount, check_name_duplicate,
-    check_project_before_edit
+    check_bulk_name_duplicates, check_full_amount, check_name_duplicate,
+    check_project_before_edit, get_bulk_items
 )
-from app.core.db import get_async_session
+from app.core.config import settings
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
 from app.crud import project_crud, donation_crud
+from app.exceptions import InvestConflictError
+from app.schemas.bulk import BulkItemResult
 from app.schemas.charity_project import (
     CharityProjectCreate, CharityProjectDB, CharityProjectUpdate
 )
-from app.services.invest_processing import invest_processing
+from app.schemas.filters import ListFilter, StreamFormat
+from app.schemas.invest import RebalanceResult
+from app.services.bulk import bulk_results, parse_bulk_items
+from app.services.invest_processing import (
+    create_bulk_with_invest_processing, create_with_invest_processing,
+    rebalance
+)
+from app.services.invest_queue import invest_queue
+from app.services.streaming import (
+    rows_response, schema_columns, stream_response
+)
 
 router = APIRouter()
 
@@ -24,6 +39,7 @@ router = APIRouter()
 )
 async def create_new_project(
         project: CharityProjectCreate,
+        response: Response,
         session: AsyncSession = Depends(get_async_session),
 ):
     """
@@ -32,25 +48,103 @@ async def create_new_project(
     Функция проверяет уникальность имени проекта,
     создает новый проект в базе данных,
     а затем распределяет имеющиеся пожертвования по принципу FIFO.
+    В режиме отложенного распределения проект только сохраняется,
+    а ответ возвращается со статусом 202. Тело ответа совпадает
+    с обычным, и суммы в нём - до распределения: признаком того,
+    что распределение ещё не выполнено, служит только статус 202.
 
     Доступно только для суперпользователей.
     """
 
     await check_name_duplicate(project.name, session)
-    new_project = await project_crud.create(project, session, commit=False)
-    donations = await donation_crud.get_objects_for_invest_processing(
-        session=session
+    if settings.invest_deferred:
+        new_project = await project_crud.create(project, session)
+        invest_queue.wake()
+        response.status_code = status.HTTP_202_ACCEPTED
+        return new_project
+
+    try:
+        new_project = await create_with_invest_processing(
+            project_crud, project, donation_crud, session
+        )
+    except InvestConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return new_project
+
+
+@router.post(
+    '/bulk',
+    response_model=list[BulkItemResult[CharityProjectDB]],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def create_projects_bulk(
+        response: Response,
+        items: list = Depends(get_bulk_items),
+        session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Создать пакет благотворительных проектов.
+
+    Тело - JSON-массив проектов или NDJSON
+    (`Content-Type: application/x-ndjson`, по одному на строку).
+    Проекты с занятыми или повторяющимися в пакете именами
+    отклоняются, остальные сохраняются одной транзакцией,
+    а имеющиеся пожертвования распределяются за один проход.
+    Для каждого элемента пакета возвращается
+    созданный проект (`created`) или ошибки (`errors`).
+    В режиме отложенного распределения ответ, как и для
+    одного проекта, возвращается со статусом 202.
+
+    Доступно только для суперпользователей.
+    """
+
+    objs_in, errors = parse_bulk_items(items, CharityProjectCreate)
+    await check_bulk_name_duplicates(objs_in, errors, session)
+    new_projects = []
+    if objs_in and settings.invest_deferred:
+        new_projects = await project_crud.create_bulk(
+            objs_in.values(), session
+        )
+        await session.commit()
+        invest_queue.wake()
+        response.status_code = status.HTTP_202_ACCEPTED
+    elif objs_in:
+        try:
+            new_projects = await create_bulk_with_invest_processing(
+                project_crud, list(objs_in.values()), session
+            )
+        except InvestConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    return bulk_results(
+        len(items), dict(zip(objs_in, new_projects)), errors
     )
 
-    updated_objects = invest_processing(new_project, donations)
 
-    for obj in updated_objects:
-        session.add(obj)
+@router.post(
+    '/rebalance',
+    response_model=RebalanceResult,
+    dependencies=[Depends(current_superuser)],
+)
+async def rebalance_projects(
+        session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Распределить все открытые пожертвования по открытым проектам.
 
-    await session.commit()
-    await session.refresh(new_project)
+    Пожертвования и проекты сводятся одним проходом в порядке
+    даты создания. Используется после массового импорта
+    или простоя очереди отложенного распределения.
 
-    return new_project
+    Доступно только для суперпользователей.
+    """
+
+    try:
+        return await rebalance(session)
+    except InvestConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.patch(
@@ -131,9 +225,27 @@ async def delete_project(
             response_model=list[CharityProjectDB],
             response_model_exclude_none=True, )
 async def get_project(
-        session: AsyncSession = Depends(get_async_session)
+        list_filter: ListFilter = Depends(),
+        stream: Optional[StreamFormat] = None,
+        session: AsyncSession = Depends(get_async_read_session)
 ):
-    """Получить все проекты."""
+    """
+    Получить проекты.
 
-    projects = await project_crud.get_multi(session)
-    return projects
+    Поддерживает постраничную выборку по ключу: `limit` задаёт
+    размер страницы, `after` — id последнего полученного проекта.
+    Фильтры: `fully_invested`, `create_date_from`, `create_date_to`.
+    С параметром `stream` (`ndjson` или `json`) проекты отдаются
+    потоком прямо из курсора БД.
+    """
+
+    columns = schema_columns(CharityProjectDB)
+    if stream is not None:
+        return stream_response(
+            project_crud.stream_rows(session, columns, list_filter),
+            stream, exclude_none=True
+        )
+    projects = await project_crud.get_multi_rows(
+        session, columns, list_filter
+    )
+    return rows_response(projects, exclude_none=True)
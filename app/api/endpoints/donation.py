@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.api.validators import get_bulk_items
+from app.core.config import settings
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser, current_user
 from app.crud import donation_crud, project_crud
+from app.exceptions import InvestConflictError
 from app.models import User
+from app.schemas.bulk import BulkItemResult
 from app.schemas.donation import (
     DonationCreate, DonationDB, DonationSuperUserDB
 )
-from app.services.invest_processing import invest_processing
+from app.schemas.filters import (
+    DonationListFilter, ListFilter, StreamFormat
+)
+from app.services.bulk import bulk_results, parse_bulk_items
+from app.services.invest_processing import (
+    create_bulk_with_invest_processing, create_with_invest_processing
+)
+from app.services.invest_queue import invest_queue
+from app.services.streaming import (
+    rows_response, schema_columns, stream_response
+)
 
 router = APIRouter()
 
@@ -22,6 +38,7 @@ router = APIRouter()
 )
 async def create_new_donation(
         donation: DonationCreate,
+        response: Response,
         session: AsyncSession = Depends(get_async_session),
         user: User = Depends(current_user)
 ):
@@ -33,24 +50,76 @@ async def create_new_donation(
     создает запись в базе данных и распределяет пожертвование
     по проектам, требующим финансирования.
 
+    В режиме отложенного распределения пожертвование только
+    сохраняется, а ответ возвращается со статусом 202.
+    Тело ответа совпадает с обычным: признаком того,
+    что распределение ещё не выполнено, служит только статус 202.
+
     Доступно только для авторизованных пользователей.
     """
-    new_donation = await donation_crud.create(
-        obj_in=donation, session=session, user=user, commit=False
-    )
+    if settings.invest_deferred:
+        new_donation = await donation_crud.create(
+            obj_in=donation, session=session, user=user
+        )
+        invest_queue.wake()
+        response.status_code = status.HTTP_202_ACCEPTED
+        return new_donation
+
+    try:
+        new_donation = await create_with_invest_processing(
+            donation_crud, donation, project_crud, session, user=user
+        )
+    except InvestConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    projects = await project_crud.get_objects_for_invest_processing(
-        session=session
-    )
-    updated_objects = invest_processing(new_donation, projects)
+    return new_donation
 
-    for obj in updated_objects:
-        session.add(obj)
 
-    await session.commit()
-    await session.refresh(new_donation)
+@router.post(
+    '/bulk',
+    response_model=list[BulkItemResult[DonationDB]],
+    response_model_exclude_none=True,
+)
+async def create_donations_bulk(
+        response: Response,
+        items: list = Depends(get_bulk_items),
+        session: AsyncSession = Depends(get_async_session),
+        user: User = Depends(current_user)
+):
+    """
+    Создать пакет пожертвований.
 
-    return new_donation
+    Тело - JSON-массив пожертвований или NDJSON
+    (`Content-Type: application/x-ndjson`, по одному на строку).
+    Корректные пожертвования сохраняются одной транзакцией
+    и распределяются по проектам за один проход.
+    Для каждого элемента пакета возвращается
+    созданное пожертвование (`created`) или ошибки (`errors`).
+    В режиме отложенного распределения ответ, как и для
+    одного пожертвования, возвращается со статусом 202.
+
+    Доступно только для авторизованных пользователей.
+    """
+    objs_in, errors = parse_bulk_items(items, DonationCreate)
+    new_donations = []
+    if objs_in and settings.invest_deferred:
+        new_donations = await donation_crud.create_bulk(
+            objs_in.values(), session, user=user
+        )
+        await session.commit()
+        invest_queue.wake()
+        response.status_code = status.HTTP_202_ACCEPTED
+    elif objs_in:
+        try:
+            new_donations = await create_bulk_with_invest_processing(
+                donation_crud, list(objs_in.values()), session, user=user
+            )
+        except InvestConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    return bulk_results(
+        len(items), dict(zip(objs_in, new_donations)), errors
+    )
 
 
 @router.get('/',
@@ -58,7 +127,9 @@ async def create_new_donation(
             response_model_exclude_none=True,
             dependencies=[Depends(current_superuser)])
 async def get_donations(
-        session: AsyncSession = Depends(get_async_session)
+        list_filter: DonationListFilter = Depends(),
+        stream: Optional[StreamFormat] = None,
+        session: AsyncSession = Depends(get_async_read_session)
 ):
     """
     Получить список всех пожертвований.
@@ -69,10 +140,23 @@ async def get_donations(
     - Статус завершённости инвестирования (`fully_invested`)
     - Дата закрытия пожертвования (`close_date`)
 
+    Поддерживает постраничную выборку по ключу (`limit`, `after`)
+    и фильтры `fully_invested`, `create_date_from`, `create_date_to`,
+    `user_id`. С параметром `stream` (`ndjson` или `json`)
+    пожертвования отдаются потоком прямо из курсора БД.
+
     Эта информация доступна только для суперпользователей.
     """
-    donations = await donation_crud.get_multi(session)
-    return donations
+    columns = schema_columns(DonationSuperUserDB)
+    if stream is not None:
+        return stream_response(
+            donation_crud.stream_rows(session, columns, list_filter),
+            stream, exclude_none=True
+        )
+    donations = await donation_crud.get_multi_rows(
+        session, columns, list_filter
+    )
+    return rows_response(donations, exclude_none=True)
 
 
 @router.get(
@@ -80,10 +164,26 @@ async def get_donations(
     response_model=list[DonationDB],
 )
 async def get_my_donations(
-        session: AsyncSession = Depends(get_async_session),
+        list_filter: ListFilter = Depends(),
+        stream: Optional[StreamFormat] = None,
+        session: AsyncSession = Depends(get_async_read_session),
         user: User = Depends(current_user)
 ):
-    """Получить список всех пожертвований текущего пользователя."""
+    """
+    Получить список пожертвований текущего пользователя.
+
+    Поддерживает те же параметры выборки и потоковую отдачу,
+    что и список проектов.
+    """
+
+    columns = schema_columns(DonationDB)
+    list_filter = donation_crud.user_filter(user, list_filter)
+    if stream is not None:
+        return stream_response(
+            donation_crud.stream_rows(session, columns, list_filter), stream
+        )
 
-    my_donations = await donation_crud.get_by_user(session=session, user=user)
-    return my_donations
+    my_donations = await donation_crud.get_multi_rows(
+        session, columns, list_filter
+    )
+    return rows_response(my_donations)
@@ -3,13 +3,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from aiogoogle import Aiogoogle
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.core.db import get_async_session
+from app.api.validators import check_report_filter
+from app.core.db import get_async_read_session, get_async_session
 from app.core.google_client import get_service
 from app.core.user import current_superuser
-from app.crud.charity_project import project_crud
-from app.services.google_api import (
-    spreadsheets_create, set_user_permissions, spreadsheets_update_value
-)
+from app.crud.report_job import report_job_crud
+from app.schemas.filters import ReportFilter
+from app.schemas.report import ReportJobDB
+from app.services.report import make_report
+from app.services.report_jobs import report_jobs
 from app.exceptions import (
     MaxColumnsExceededError, MaxRowsExceededError
 )
@@ -23,7 +25,9 @@ router = APIRouter()
     dependencies=[Depends(current_superuser)],
 )
 async def get_report(
+        report_filter: ReportFilter = Depends(),
         session: AsyncSession = Depends(get_async_session),
+        read_session: AsyncSession = Depends(get_async_read_session),
         wrapper_services: Aiogoogle = Depends(get_service)
 ):
     """
@@ -31,17 +35,16 @@ async def get_report(
     отсортированные по скорости сбора средств.
     Сформировать в гугл-таблице.
     Только для суперюзеров.
+
+    - `top` - только N самых быстрых сборов.
+    - `closed_from`, `closed_to` - только проекты,
+      закрытые в указанном интервале.
     """
-    closed_projects = await (
-        project_crud.get_projects_by_completion_rate(session)
-    )
-    spreadsheet_id, spreadsheet_url = await spreadsheets_create(
-        wrapper_services
-    )
-    await set_user_permissions(spreadsheet_id, wrapper_services)
+    check_report_filter(report_filter)
     try:
-        await spreadsheets_update_value(
-            spreadsheet_id, closed_projects, wrapper_services
+        spreadsheet_url = await make_report(
+            session, wrapper_services, report_filter,
+            read_session=read_session
         )
     except (MaxColumnsExceededError, MaxRowsExceededError) as e:
         raise HTTPException(
@@ -50,3 +53,47 @@ async def get_report(
         )
 
     return spreadsheet_url
+
+
+@router.post(
+    '/jobs',
+    response_model=ReportJobDB,
+    status_code=202,
+    dependencies=[Depends(current_superuser)],
+)
+async def create_report_job(
+        report_filter: ReportFilter = Depends(),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Поставить формирование отчёта в фоновую очередь.
+    Возвращает задание; ссылка на таблицу появится в нём,
+    когда отчёт будет готов. Параметры те же, что у `/google/`.
+    Очередь живёт в памяти процесса: если сервис перезапустился
+    до завершения отчёта, задание получает статус `failed`
+    с описанием в `error`, и отчёт нужно запросить заново.
+    Только для суперюзеров.
+    """
+    check_report_filter(report_filter)
+    job = await report_job_crud.create(session)
+    report_jobs.submit(job.id, report_filter)
+    return job
+
+
+@router.get(
+    '/jobs/{job_id}',
+    response_model=ReportJobDB,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_report_job(
+        job_id: int,
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Получить состояние задания на отчёт. Только для суперюзеров."""
+    job = await report_job_crud.get(job_id, session)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail='Задание не найдено!'
+        )
+    return job
@@ -0,0 +1,110 @@
+from pathlib import Path
+
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import get_async_read_session
+from app.core.user import current_superuser
+from app.crud import project_crud
+from app.schemas.filters import ReportFilter
+from app.schemas.report import ExportFile, ExportFormat
+from app.services.export import (
+    csv_chunks, export_available, export_closed_projects, export_file_name,
+    failed_path, is_service_file
+)
+
+router = APIRouter()
+
+
+@router.get(
+    '/closed_projects',
+    dependencies=[Depends(current_superuser)],
+)
+async def stream_closed_projects_csv(
+        report_filter: ReportFilter = Depends(),
+        session: AsyncSession = Depends(get_async_read_session)
+):
+    """
+    Отчёт о закрытых проектах в CSV, без обращений к Google.
+    Строки отдаются по мере чтения из курсора БД.
+    Только для суперюзеров.
+    """
+    return StreamingResponse(
+        csv_chunks(project_crud.stream_completed_projects(
+            session, report_filter, ordered=True
+        )),
+        media_type='text/csv',
+        headers={
+            'Content-Disposition':
+                'attachment; filename="closed_projects.csv"'
+        }
+    )
+
+
+@router.post(
+    '/closed_projects',
+    response_model=ExportFile,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(current_superuser)],
+)
+async def export_closed_projects_file(
+        file_format: ExportFormat,
+        request: Request,
+        background_tasks: BackgroundTasks,
+        report_filter: ReportFilter = Depends(),
+        session: AsyncSession = Depends(get_async_read_session)
+):
+    """
+    Выгрузить отчёт о закрытых проектах в файл (csv, xlsx, parquet).
+    Файл собирается в фоне и становится доступен по ссылке
+    из ответа, когда выгрузка завершится.
+    Только для суперюзеров.
+    """
+    if not export_available(file_format):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f'Для формата {file_format.value} не установлена '
+                   'необходимая библиотека.'
+        )
+    report_dir = Path(settings.report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    file_name = export_file_name(file_format)
+    background_tasks.add_task(
+        export_closed_projects,
+        file_format, report_dir / file_name, session, report_filter
+    )
+    return ExportFile(
+        file_name=file_name,
+        url=request.url_for('download_report', file_name=file_name)
+    )
+
+
+@router.get(
+    '/closed_projects/{file_name}',
+    dependencies=[Depends(current_superuser)],
+)
+async def download_report(file_name: str):
+    """
+    Скачать готовый файл отчёта.
+    Если выгрузка не удалась, в ответе 404 указывается её ошибка.
+    Только для суперюзеров.
+    """
+    path = Path(settings.report_dir) / file_name
+    if path.name != file_name or is_service_file(file_name):
+        raise HTTPException(status_code=404, detail='Отчёт не найден.')
+    if failed_path(path).is_file():
+        raise HTTPException(
+            status_code=404,
+            detail='Выгрузка отчёта не удалась: '
+                   f'{failed_path(path).read_text(encoding="utf-8")}'
+        )
+    if not path.is_file():
+        raise HTTPException(
+            status_code=404,
+            detail='Отчёт не найден или ещё не готов.'
+        )
+    return FileResponse(path, filename=file_name)
@@ -2,7 +2,7 @@ from fastapi import APIRouter
 
 from app.api.endpoints import (
     donation_router, project_router,
-    user_router, google_api_router
+    user_router, google_api_router, reports_router
 )
 
 main_router = APIRouter()
@@ -21,5 +21,8 @@ main_router.include_router(
 main_router.include_router(
     google_api_router, prefix='/google', tags=['Google']
 )
+main_router.include_router(
+    reports_router, prefix='/reports', tags=['Reports']
+)
 
 main_router.include_router(user_router)
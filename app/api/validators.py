@@ -1,8 +1,15 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.crud.charity_project import project_crud
+from app.exceptions import BulkPayloadError
 from app.models import CharityProject
+from app.schemas.charity_project import CharityProjectCreate
+from app.schemas.filters import ReportFilter
+from app.services.bulk import read_bulk_items
+
+NAME_DUPLICATE_MESSAGE = 'Проект с таким именем уже существует!'
 
 
 async def check_name_duplicate(
@@ -15,7 +22,7 @@ async def check_name_duplicate(
     if room_id is not None:
         raise HTTPException(
             status_code=400,
-            detail='Проект с таким именем уже существует!',
+            detail=NAME_DUPLICATE_MESSAGE,
         )
 
 
@@ -53,3 +60,54 @@ def check_full_amount(
             detail='Новая сумма не может быть '
                    'меньше инвестированной суммы.'
         )
+
+
+def check_report_filter(report_filter: ReportFilter) -> None:
+    """Проверить, что режим отчёта поддерживает параметры выборки."""
+
+    if settings.google_incremental_report and report_filter.dict(
+            exclude_none=True
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail='Инкрементальный отчёт не поддерживает '
+                   'параметры top, closed_from и closed_to.'
+        )
+
+
+async def get_bulk_items(request: Request) -> list:
+    """Прочитать элементы пакетного запроса или вернуть 400."""
+
+    try:
+        return await read_bulk_items(request)
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def check_bulk_name_duplicates(
+        objs_in: dict[int, CharityProjectCreate],
+        errors: dict[int, list],
+        session: AsyncSession
+) -> None:
+    """
+    Отклонить проекты пакета с уже занятыми именами.
+
+    Из повторяющихся внутри пакета имён остаётся первое.
+    Отклонённые проекты убираются из `objs_in`,
+    а их ошибки добавляются в `errors`.
+    """
+
+    if not objs_in:
+        return
+    taken = await project_crud.get_existing_names(
+        (obj_in.name for obj_in in objs_in.values()), session
+    )
+    for index, obj_in in list(objs_in.items()):
+        if obj_in.name in taken:
+            del objs_in[index]
+            errors[index] = [{
+                'loc': ['name'],
+                'msg': NAME_DUPLICATE_MESSAGE,
+                'type': 'value_error.duplicate',
+            }]
+        taken.add(obj_in.name)
@@ -4,6 +4,12 @@ FULL_AMOUNT_MIN_VALUE = 0
 LIFETIME_SECONDS = 3600
 MIN_LEN_PASSWORD = 3
 INVESTED_AMOUNT_INIT = 0
+INVEST_BATCH_SIZE = 100
+INVEST_RETRY_DELAY = 0.05
+INVEST_QUEUE_RETRY_DELAY = 1
+INVEST_QUEUE_MAX_DELAY = 60
+MAX_PAGE_LIMIT = 1000
+BULK_MAX_ITEMS = 10_000
 
 SECONDS_OF_ONE_DAY = 86400
 SECONDS_OF_HOUR = 3600
@@ -12,4 +18,7 @@ FORMAT = "%Y/%m/%d %H:%M:%S"
 
 MAX_ROWS = 100
 MAX_COLUMNS = 11
+MAX_CELLS = 10_000_000
+REPORT_CHUNK_ROWS = 1000
+REPORT_PAYLOAD_LIMIT = 1_000_000
 SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/'
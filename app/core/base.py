@@ -1,3 +1,6 @@
 """Импорты класса Base и всех моделей для Alembic."""
 from app.core.db import Base  # noqa
-from app.models import CharityProject, Donation, User  # noqa
+from app.models import (  # noqa
+    CharityProject, Donation, ProjectCompletion, ReportJob,
+    ReportSpreadsheet, User
+)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseSettings
 
@@ -6,7 +6,22 @@ from pydantic import BaseSettings
 class Settings(BaseSettings):
     app_title: str = 'QRKot'
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
+    replica_url: Optional[str] = None
+    replica_read_after_write: float = 5.0
     secret: str = 'SECRET'
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    asyncpg_statement_cache_size: int = 100
+    sqlite_journal_mode: str = 'WAL'
+    sqlite_synchronous: str = 'NORMAL'
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    invest_engine: Literal['orm', 'sql'] = 'orm'
+    invest_retries: int = 5
+    invest_deferred: bool = False
 
     type: Optional[str] = None
     project_id: Optional[str] = None
@@ -19,6 +34,15 @@ class Settings(BaseSettings):
     auth_provider_x509_cert_url: Optional[str] = None
     client_x509_cert_url: Optional[str] = None
     email: Optional[str] = None
+    google_pool_size: int = 10
+    google_reuse_spreadsheet: bool = False
+    google_report_sheets_limit: int = 50
+    google_incremental_report: bool = False
+    report_ranking: Literal['index', 'heap'] = 'index'
+    report_dir: str = 'reports'
+    report_jobs_limit: int = 2
+    google_discovery_ttl: int = 86400
+    google_discovery_cache_dir: Optional[str] = None
 
     class Config:
         env_file = '.env'
@@ -1,6 +1,15 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import math
+import time
+from typing import Optional
+
+from fastapi import Cookie, Response
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, create_async_engine
+)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
 
@@ -15,11 +24,152 @@ class PreBase:
 
 
 Base = declarative_base(cls=PreBase)
-engine = create_async_engine(settings.database_url)
 
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
 
+def engine_options(database_url: str) -> dict:
+    """
+    Параметры create_async_engine для выбранной СУБД.
+
+    Файловая SQLite по умолчанию открывает соединение на каждую
+    сессию, поэтому для неё тоже включается пул соединений.
+    Для asyncpg задаётся размер кэша подготовленных запросов.
+    """
+
+    url = make_url(database_url)
+    options = {
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.pool_max_overflow,
+        'pool_timeout': settings.pool_timeout,
+        'pool_recycle': settings.pool_recycle,
+    }
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        options['poolclass'] = AsyncAdaptedQueuePool
+        return options
+    options['pool_pre_ping'] = settings.pool_pre_ping
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'prepared_statement_cache_size':
+                settings.asyncpg_statement_cache_size
+        }
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Настроить новое соединение SQLite: WAL, синхронизация, ожидание."""
+
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        f'journal_mode={settings.sqlite_journal_mode}',
+        f'synchronous={settings.sqlite_synchronous}',
+        f'busy_timeout={settings.sqlite_busy_timeout}',
+        f'mmap_size={settings.sqlite_mmap_size}',
+    ):
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
+
+
+def create_engine(database_url: str) -> AsyncEngine:
+    """Создать движок с настройками пула и СУБД из Settings."""
+
+    async_engine = create_async_engine(
+        database_url, **engine_options(database_url)
+    )
+    if async_engine.dialect.name == 'sqlite':
+        event.listen(async_engine.sync_engine, 'connect', set_sqlite_pragmas)
+    return async_engine
+
+
+class ReplicaRouter:
+    """
+    Выбор БД для запросов только на чтение.
+
+    Чтения идут на реплику. Клиент, который сам только что
+    зафиксировал запись, ещё `read_after_write` секунд читает
+    с основной БД: реплика может не успеть получить его изменения.
+    Окно хранится в cookie клиента, поэтому записи одних клиентов
+    не переводят на основную БД чтения остальных. Клиенты без
+    cookie читают с реплики сразу и могут не увидеть свою запись.
+    Без реплики все чтения идут на основную БД.
+    """
+
+    COOKIE = 'read_primary_until'
+
+    def __init__(
+            self,
+            primary: sessionmaker,
+            replica: Optional[sessionmaker] = None,
+            read_after_write: float = 0
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.read_after_write = read_after_write
+
+    def watch(self, session: AsyncSession, response: Response) -> None:
+        """Открыть клиенту окно чтения с основной БД после его commit."""
 
-async def get_async_session():
+        if self.replica is None or self.read_after_write <= 0:
+            return
+
+        def mark_write(*args) -> None:
+            response.set_cookie(
+                self.COOKIE, str(time.time() + self.read_after_write),
+                max_age=math.ceil(self.read_after_write), httponly=True
+            )
+
+        event.listen(session.sync_session, 'after_commit', mark_write)
+
+    def session_factory(
+            self,
+            read_primary_until: Optional[str] = None
+    ) -> sessionmaker:
+        if self.replica is None:
+            return self.primary
+        try:
+            if time.time() < float(read_primary_until):
+                return self.primary
+        except (TypeError, ValueError):
+            pass
+        return self.replica
+
+    def __call__(
+            self,
+            read_primary_until: Optional[str] = None
+    ) -> AsyncSession:
+        return self.session_factory(read_primary_until)()
+
+
+engine = create_engine(settings.database_url)
+
+# Объекты не сбрасываются после commit: их поля уже заполнены
+# при flush, и повторный SELECT ради ответа API не нужен.
+AsyncSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+AsyncReadSessionLocal = (
+    sessionmaker(
+        create_engine(settings.replica_url), class_=AsyncSession,
+        expire_on_commit=False
+    )
+    if settings.replica_url else None
+)
+
+replica_router = ReplicaRouter(
+    AsyncSessionLocal, AsyncReadSessionLocal,
+    settings.replica_read_after_write
+)
+
+
+async def get_async_session(response: Response):
     async with AsyncSessionLocal() as async_session:
+        replica_router.watch(async_session, response)
+        yield async_session
+
+
+async def get_async_read_session(
+        read_primary_until: Optional[str] = Cookie(None)
+):
+    async with replica_router(read_primary_until) as async_session:
         yield async_session
@@ -1,5 +1,10 @@
+import asyncio
+from typing import Optional
+
 from aiogoogle import Aiogoogle
 from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+from aiohttp import TCPConnector
 
 from app.core.config import settings
 
@@ -24,6 +29,66 @@ INFO = {
 cred = ServiceAccountCreds(scopes=SCOPES, **INFO)
 
 
+class SharedAiohttpSession(AiohttpSession):
+    """HTTP-сессия с пулом соединений, которую не закрывает `async with`."""
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+class SharedAiogoogle(Aiogoogle):
+    """
+    Клиент Google API, общий для всех запросов приложения.
+
+    Все запросы идут через одну сессию с пулом соединений,
+    а токен сервисного аккаунта запрашивается один раз
+    и обновляется только незадолго до истечения.
+    """
+
+    def __init__(self, creds: ServiceAccountCreds, pool_size: int):
+        self.http_session = SharedAiohttpSession(
+            connector=TCPConnector(limit=pool_size)
+        )
+        super().__init__(
+            service_account_creds=creds,
+            session_factory=lambda: self.http_session
+        )
+        self.token_lock = asyncio.Lock()
+
+    async def as_service_account(self, *requests, **kwargs):
+        async with self.token_lock:
+            await self.service_account_manager.refresh()
+        return await super().as_service_account(*requests, **kwargs)
+
+    async def close(self) -> None:
+        await self.http_session.close()
+
+
+shared_client: Optional[SharedAiogoogle] = None
+
+
+async def open_google_client(
+        creds: ServiceAccountCreds = cred
+) -> SharedAiogoogle:
+    """Создать общий клиент; вызывается при старте приложения."""
+
+    global shared_client
+    shared_client = SharedAiogoogle(creds, settings.google_pool_size)
+    return shared_client
+
+
+async def close_google_client() -> None:
+    """Закрыть общий клиент и его соединения."""
+
+    global shared_client
+    if shared_client is not None:
+        await shared_client.close()
+        shared_client = None
+
+
 async def get_service():
+    if shared_client is not None:
+        yield shared_client
+        return
     async with Aiogoogle(service_account_creds=cred) as aiogoogle:
         yield aiogoogle
@@ -1,25 +1,45 @@
-from typing import Generic, Optional, Type, TypeVar
+from datetime import datetime
+from functools import lru_cache
+from typing import (
+    AsyncIterator, Generic, Iterable, Optional, Type, TypeVar
+)
 
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import case, func, inspect, select, tuple_, update
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.constants import INVESTED_AMOUNT_INIT
+from app.constants import INVEST_BATCH_SIZE, INVESTED_AMOUNT_INIT
 from app.core.db import Base
 from app.models.user import User
+from app.schemas.filters import ListFilter
 
 ModelType = TypeVar('ModelType', bound=Base)
 CreateSchemaType = TypeVar('CreateSchemaType', bound=BaseModel)
 UpdateSchemaType = TypeVar('UpdateSchemaType', bound=BaseModel)
 
 
+@lru_cache
+def column_names(model: Type[Base]) -> frozenset[str]:
+    """Имена атрибутов модели, отображённых на колонки таблицы."""
+
+    return frozenset(inspect(model).column_attrs.keys())
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """CRUDBase для создания и получения."""
 
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
+    @staticmethod
+    def can_lock_rows(session: AsyncSession) -> bool:
+        """Блокирует ли БД отдельные строки через SELECT ... FOR UPDATE."""
+
+        return session.bind.dialect.name == 'postgresql'
+
     async def get(
             self,
             obj_id: int,
@@ -32,40 +52,229 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         )
         return db_obj.scalars().first()
 
-    async def get_multi(self, session: AsyncSession) -> list[ModelType]:
-        """Получить список объектов."""
+    def filter_query(self, query: Select, list_filter: ListFilter) -> Select:
+        """
+        Применить фильтры и постраничную выборку по ключу id.
 
-        db_objs = await session.execute(select(self.model))
-        return db_objs.scalars().all()
+        Страница начинается сразу после `after`, поэтому
+        N-я страница стоит столько же, сколько первая.
+        """
 
-    async def get_objects_for_invest_processing(
-            self, session: AsyncSession
-    ) -> list[ModelType]:
+        if list_filter.after is not None:
+            query = query.where(self.model.id > list_filter.after)
+        if list_filter.fully_invested is not None:
+            query = query.where(
+                self.model.fully_invested.is_(list_filter.fully_invested)
+            )
+        if list_filter.create_date_from is not None:
+            query = query.where(
+                self.model.create_date >= list_filter.create_date_from
+            )
+        if list_filter.create_date_to is not None:
+            query = query.where(
+                self.model.create_date <= list_filter.create_date_to
+            )
+        if getattr(list_filter, 'user_id', None) is not None:
+            query = query.where(self.model.user_id == list_filter.user_id)
+        return query.order_by(self.model.id).limit(list_filter.limit)
+
+    def rows_query(
+            self,
+            columns: Iterable[str],
+            list_filter: Optional[ListFilter] = None
+    ) -> Select:
+        """Выборка только нужных колонок, без создания ORM-объектов."""
+
+        query = select(*(getattr(self.model, name) for name in columns))
+        if list_filter is not None:
+            query = self.filter_query(query, list_filter)
+        return query
+
+    async def get_multi_rows(
+            self,
+            session: AsyncSession,
+            columns: Iterable[str],
+            list_filter: Optional[ListFilter] = None
+    ) -> list[Row]:
+        """Получить список строк с выбранными колонками."""
+
+        rows = await session.execute(self.rows_query(columns, list_filter))
+        return rows.all()
+
+    async def stream_rows(
+            self,
+            session: AsyncSession,
+            columns: Iterable[str],
+            list_filter: Optional[ListFilter] = None
+    ) -> AsyncIterator[Row]:
+        """Отдавать строки с выбранными колонками через серверный курсор."""
+
+        rows = await session.stream(self.rows_query(columns, list_filter))
+        async for row in rows:
+            yield row
+
+    async def iter_objects_for_invest_processing(
+            self,
+            session: AsyncSession,
+            batch_size: int = INVEST_BATCH_SIZE
+    ) -> AsyncIterator[ModelType]:
         """
-        Получить список открытых объектов
-        отсортированных по дате создания.
+        Отдавать открытые объекты в порядке даты создания,
+        подгружая их страницами по ключу (create_date, id).
+
+        Следующая страница запрашивается только тогда,
+        когда потребитель дочитал предыдущую.
+        На PostgreSQL строки блокируются: параллельная транзакция
+        ждёт, пока заблокировавшая их зафиксируется, и читает
+        уже новые суммы. Пропускать занятые строки нельзя:
+        новый объект остался бы открытым рядом с открытыми
+        встречными объектами.
         """
 
-        db_objs = await session.execute(
-            select(self.model).where(
+        lock_rows = self.can_lock_rows(session)
+        last_key = None
+        while True:
+            query = select(self.model).where(
                 self.model.fully_invested.is_(False)
-            ).order_by(self.model.create_date)
+            )
+            if last_key is not None:
+                query = query.where(
+                    tuple_(self.model.create_date, self.model.id) >
+                    tuple_(*last_key)
+                )
+            if lock_rows:
+                query = query.with_for_update()
+            db_objs = await session.execute(
+                query.order_by(
+                    self.model.create_date, self.model.id
+                ).limit(batch_size)
+            )
+            batch = db_objs.scalars().all()
+
+            for db_obj in batch:
+                yield db_obj
+
+            # Строки, закрытые за время ожидания блокировки,
+            # выпадают из страницы, поэтому на PostgreSQL
+            # неполная страница ещё не означает конец выборки.
+            if not batch or len(batch) < batch_size and not lock_rows:
+                return
+            last_key = (batch[-1].create_date, batch[-1].id)
+
+    async def invest_bulk(
+            self,
+            available_amount: int,
+            session: AsyncSession
+    ) -> int:
+        """
+        Распределить сумму по открытым объектам одним UPDATE.
+
+        Доли считаются оконной функцией: нарастающий итог
+        недостающих сумм в порядке даты создания.
+        Строки обновляются только при неизменной версии,
+        иначе выбрасывается StaleDataError.
+        На PostgreSQL открытые строки сначала блокируются отдельным
+        запросом, чтобы доли считались уже по зафиксированным суммам.
+        Возвращает фактически распределённую сумму.
+        """
+
+        is_open = self.model.fully_invested.is_(False)
+        if self.can_lock_rows(session):
+            await session.execute(
+                select(self.model.id).where(is_open).with_for_update()
+            )
+
+        required = self.model.full_amount - self.model.invested_amount
+        open_objects = select(
+            self.model.id,
+            self.model.version,
+            required.label('required'),
+            (
+                func.sum(required).over(
+                    order_by=(self.model.create_date, self.model.id)
+                ) - required
+            ).label('required_before')
+        ).where(is_open).subquery('open_objects')
+
+        rest = available_amount - open_objects.c.required_before
+        allocation = await session.execute(
+            select(
+                open_objects.c.id,
+                open_objects.c.version,
+                case(
+                    (open_objects.c.required < rest, open_objects.c.required),
+                    else_=rest
+                ).label('amount')
+            ).where(
+                open_objects.c.required_before < available_amount
+            )
+        )
+        allocation = allocation.all()
+        if not allocation:
+            return 0
+
+        new_invested_amount = self.model.invested_amount + case(
+            {row.id: row.amount for row in allocation},
+            value=self.model.id
+        )
+        is_closed = new_invested_amount == self.model.full_amount
+        updated = await session.execute(
+            update(self.model).where(
+                tuple_(self.model.id, self.model.version).in_(
+                    [(row.id, row.version) for row in allocation]
+                )
+            ).values(
+                invested_amount=new_invested_amount,
+                version=self.model.version + 1,
+                fully_invested=is_closed,
+                close_date=case(
+                    (is_closed, datetime.now()),
+                    else_=self.model.close_date
+                )
+            ).execution_options(synchronize_session=False)
         )
-        return db_objs.scalars().all()
+        if updated.rowcount != len(allocation):
+            raise StaleDataError(
+                f'{self.model.__tablename__}: обновлено '
+                f'{updated.rowcount} строк из {len(allocation)}.'
+            )
+        await self.record_closed([row.id for row in allocation], session)
+        return sum(row.amount for row in allocation)
+
+    async def record_closed(
+            self,
+            obj_ids: list[int],
+            session: AsyncSession
+    ) -> None:
+        """
+        Обработать объекты, которые могли закрыться в invest_bulk.
+
+        Массовый UPDATE не вызывает событий ORM, поэтому модели,
+        которым нужно реагировать на закрытие, переопределяют метод.
+        """
 
     async def create(
             self,
             obj_in: CreateSchemaType,
             session: AsyncSession,
             user: Optional[User] = None,
-            commit: bool = True
+            commit: bool = True,
+            user_id: Optional[int] = None
     ) -> ModelType:
-        """Создать объект."""
+        """
+        Создать объект.
+
+        Вместо `user` можно передать `user_id`: после отката
+        транзакции пользователь из сессии уже не загружен,
+        и обращение к `user.id` потребовало бы нового запроса.
+        """
 
         obj_in_data = obj_in.dict()
 
         if user is not None:
-            obj_in_data['user_id'] = user.id
+            user_id = user.id
+        if user_id is not None:
+            obj_in_data['user_id'] = user_id
 
         obj_in_data.setdefault('invested_amount', INVESTED_AMOUNT_INIT)
 
@@ -74,28 +283,55 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         if commit:
             await session.commit()
-            await session.refresh(db_obj)
 
         return db_obj
 
+    async def create_bulk(
+            self,
+            objs_in: Iterable[CreateSchemaType],
+            session: AsyncSession,
+            user: Optional[User] = None,
+            user_id: Optional[int] = None
+    ) -> list[ModelType]:
+        """
+        Добавить объекты пакетом без фиксации транзакции.
+
+        Все строки отправляются одним flush, после которого
+        у объектов уже есть id.
+        """
+
+        if user is not None:
+            user_id = user.id
+        db_objs = [
+            await self.create(
+                obj_in, session, commit=False, user_id=user_id
+            )
+            for obj_in in objs_in
+        ]
+        await session.flush()
+        return db_objs
+
     async def update(
             self,
             db_obj: ModelType,
             obj_in: UpdateSchemaType,
             session: AsyncSession
     ) -> ModelType:
-        """Обновить объект."""
+        """
+        Обновить объект.
 
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(exclude_unset=True)
+        Меняются только колонки модели, значения которых
+        отличаются от текущих: flush отправит один UPDATE
+        с этими полями, а если изменений нет - не отправит ничего.
+        """
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        columns = column_names(self.model)
+        for field, value in obj_in.dict(exclude_unset=True).items():
+            if field in columns and getattr(db_obj, field) != value:
+                setattr(db_obj, field, value)
 
         session.add(db_obj)
         await session.commit()
-        await session.refresh(db_obj)
         return db_obj
 
     async def remove(
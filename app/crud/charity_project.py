@@ -1,13 +1,18 @@
-from typing import Optional
+from typing import AsyncIterator, Iterable, Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import exists, insert, select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.crud.base import CRUDBase
+from app.crud.expressions import duration_seconds
 from app.models.charity_project import CharityProject
+from app.models.project_completion import ProjectCompletion
 from app.schemas.charity_project import (
     CharityProjectCreate, CharityProjectUpdate
 )
+from app.schemas.filters import ReportFilter
 
 
 class CRUDCharityProject(
@@ -32,26 +37,133 @@ class CRUDCharityProject(
         db_project_id = db_project_id.scalars().first()
         return db_project_id
 
+    async def get_existing_names(
+            self,
+            project_names: Iterable[str],
+            session: AsyncSession,
+    ) -> set[str]:
+        """Выбрать из списка имена, которые уже заняты проектами."""
+
+        db_names = await session.execute(
+            select(CharityProject.name).where(
+                CharityProject.name.in_(set(project_names))
+            )
+        )
+        return set(db_names.scalars().all())
+
+    @staticmethod
+    def completion_query(
+            report_filter: Optional[ReportFilter] = None,
+            completed_after: Optional[int] = None
+    ) -> Select:
+        """Закрытые проекты с длительностью сбора, без сортировки."""
+
+        query = select(
+            CharityProject.name,
+            ProjectCompletion.duration_seconds,
+            CharityProject.description,
+            ProjectCompletion.close_date,
+            CharityProject.id,
+            ProjectCompletion.id.label('completion_id')
+        ).join(
+            ProjectCompletion,
+            ProjectCompletion.project_id == CharityProject.id
+        )
+        if completed_after is not None:
+            query = query.where(ProjectCompletion.id > completed_after)
+        if report_filter is not None:
+            if report_filter.closed_from is not None:
+                query = query.where(
+                    ProjectCompletion.close_date >= report_filter.closed_from
+                )
+            if report_filter.closed_to is not None:
+                query = query.where(
+                    ProjectCompletion.close_date <= report_filter.closed_to
+                )
+        return query
+
+    def ranking_query(
+            self,
+            report_filter: Optional[ReportFilter] = None,
+            completed_after: Optional[int] = None
+    ) -> Select:
+        """
+        Закрытые проекты от самого быстрого сбора к самому долгому.
+
+        Сортировка идёт по индексу project_completion;
+        `top` из фильтра становится LIMIT, окно дат - условием WHERE.
+        """
+
+        query = self.completion_query(report_filter, completed_after).order_by(
+            ProjectCompletion.duration_seconds, ProjectCompletion.project_id
+        )
+        if report_filter is not None:
+            query = query.limit(report_filter.top)
+        return query
+
     async def get_projects_by_completion_rate(
             self,
-            session: AsyncSession
+            session: AsyncSession,
+            completed_after: Optional[int] = None,
+            report_filter: Optional[ReportFilter] = None
     ):
         """
         Получить закрытые проекты
         с временным расчетом по дате сбора средств.
+        С `completed_after` - только записанные в projectcompletion
+        после строки с указанным id.
         """
-        query = select(
-            CharityProject.name,
-            (func.julianday(CharityProject.close_date) -
-             func.julianday(CharityProject.create_date)
-             ).label('duration_days'),
-            CharityProject.description
-        ).where(
-            CharityProject.fully_invested.is_(True)
-        ).order_by('duration_days')
-        projects = await session.execute(query)
+        projects = await session.execute(
+            self.ranking_query(report_filter, completed_after)
+        )
         projects = projects.all()
         return projects
 
+    async def stream_completed_projects(
+            self,
+            session: AsyncSession,
+            report_filter: Optional[ReportFilter] = None,
+            ordered: bool = False
+    ) -> AsyncIterator[Row]:
+        """
+        Отдавать закрытые проекты через серверный курсор.
+
+        Без `ordered` строки идут в порядке хранения.
+        """
+
+        query = (
+            self.ranking_query(report_filter) if ordered
+            else self.completion_query(report_filter)
+        )
+        rows = await session.stream(query)
+        async for row in rows:
+            yield row
+
+    async def record_closed(
+            self,
+            obj_ids: list[int],
+            session: AsyncSession
+    ) -> None:
+        """Записать длительность сбора закрытых проектов."""
+
+        await session.execute(
+            insert(ProjectCompletion).from_select(
+                ['project_id', 'duration_seconds', 'close_date'],
+                select(
+                    CharityProject.id,
+                    duration_seconds(
+                        CharityProject.create_date, CharityProject.close_date
+                    ),
+                    CharityProject.close_date
+                ).where(
+                    CharityProject.id.in_(obj_ids),
+                    CharityProject.fully_invested.is_(True),
+                    ~exists().where(
+                        ProjectCompletion.project_id == CharityProject.id
+                    )
+                )
+            )
+        )
+
 
 project_crud = CRUDCharityProject(CharityProject)
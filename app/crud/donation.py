@@ -1,9 +1,9 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from app.crud.base import CRUDBase
 from app.models import Donation, User
 from app.schemas.donation import DonationCreate
+from app.schemas.filters import DonationListFilter, ListFilter
 
 
 class CRUDDonation(
@@ -12,13 +12,15 @@ class CRUDDonation(
         DonationCreate,
         None]
 ):
-    async def get_by_user(self, session: AsyncSession, user: User):
-        """Получить донаты пользовователя."""
-        query = select(Donation).where(
-            Donation.user_id == user.id
+    @staticmethod
+    def user_filter(
+            user: User,
+            list_filter: Optional[ListFilter] = None
+    ) -> DonationListFilter:
+        """Ограничить фильтр пожертвованиями пользователя."""
+        return DonationListFilter(
+            **(list_filter.dict() if list_filter else {}), user_id=user.id
         )
-        all_donations = await session.execute(query)
-        return all_donations.scalars().all()
 
 
 donation_crud = CRUDDonation(Donation)
@@ -0,0 +1,37 @@
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.constants import SECONDS_OF_ONE_DAY
+
+
+class duration_seconds(FunctionElement):
+    """
+    Длительность между двумя датами в целых секундах.
+
+    `duration_seconds(start, end)` компилируется
+    в выражение, которое поддерживает текущая СУБД.
+    """
+
+    type = Integer()
+    name = 'duration_seconds'
+    inherit_cache = True
+
+
+@compiles(duration_seconds)
+def compile_duration_seconds(element, compiler, **kw):
+    start, end = element.clauses
+    return 'CAST(EXTRACT(EPOCH FROM {} - {}) AS INTEGER)'.format(
+        compiler.process(end, **kw), compiler.process(start, **kw)
+    )
+
+
+@compiles(duration_seconds, 'sqlite')
+def compile_duration_seconds_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return (
+        'CAST(ROUND((julianday({}) - julianday({})) * {}) AS INTEGER)'.format(
+            compiler.process(end, **kw), compiler.process(start, **kw),
+            SECONDS_OF_ONE_DAY
+        )
+    )
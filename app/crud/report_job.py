@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.report_job import ReportJob
+from app.schemas.report import ReportJobStatus
+
+
+class CRUDReportJob:
+    """Задания на формирование отчёта и их состояние."""
+
+    model = ReportJob
+
+    async def create(self, session: AsyncSession) -> ReportJob:
+        """Создать задание в статусе pending."""
+
+        job = self.model(status=ReportJobStatus.pending.value)
+        session.add(job)
+        await session.commit()
+        return job
+
+    async def get(
+            self,
+            job_id: int,
+            session: AsyncSession
+    ) -> Optional[ReportJob]:
+        job = await session.execute(
+            select(self.model).where(self.model.id == job_id)
+        )
+        return job.scalars().first()
+
+    async def set_status(
+            self,
+            job_id: int,
+            status: ReportJobStatus,
+            session: AsyncSession,
+            **values
+    ) -> None:
+        """Обновить статус задания и, при необходимости, результат."""
+
+        if status in (ReportJobStatus.done, ReportJobStatus.failed):
+            values['finish_date'] = datetime.now()
+        await session.execute(
+            update(self.model)
+            .where(self.model.id == job_id)
+            .values(status=status.value, **values)
+        )
+        await session.commit()
+
+    async def fail_unfinished(self, session: AsyncSession, error: str) -> int:
+        """Пометить ошибкой задания, оставшиеся незавершёнными."""
+
+        failed = await session.execute(
+            update(self.model)
+            .where(self.model.status.in_([
+                ReportJobStatus.pending.value, ReportJobStatus.running.value
+            ]))
+            .values(
+                status=ReportJobStatus.failed.value,
+                error=error,
+                finish_date=datetime.now()
+            )
+        )
+        await session.commit()
+        return failed.rowcount
+
+
+report_job_crud = CRUDReportJob()
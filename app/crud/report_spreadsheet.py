@@ -0,0 +1,109 @@
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.report_spreadsheet import ReportSpreadsheet
+
+
+class CRUDReportSpreadsheet:
+    """Реестр гугл-таблиц, в которые дописываются отчёты."""
+
+    model = ReportSpreadsheet
+
+    async def register(
+            self,
+            spreadsheet_id: str,
+            session: AsyncSession,
+            incremental: bool = False,
+            watermark: Optional[int] = None
+    ) -> ReportSpreadsheet:
+        """Зарегистрировать новую таблицу с одним листом."""
+
+        spreadsheet = self.model(
+            spreadsheet_id=spreadsheet_id,
+            incremental=incremental,
+            last_completion_id=watermark
+        )
+        session.add(spreadsheet)
+        await session.commit()
+        return spreadsheet
+
+    async def get_incremental(self, session: AsyncSession) -> Optional[Row]:
+        """Получить таблицу инкрементального отчёта и её отметку."""
+
+        spreadsheet = await session.execute(
+            select(
+                self.model.id,
+                self.model.spreadsheet_id,
+                self.model.last_completion_id
+            )
+            .where(self.model.incremental.is_(True))
+            .order_by(self.model.id.desc()).limit(1)
+        )
+        return spreadsheet.first()
+
+    async def move_watermark(
+            self,
+            spreadsheet_id: int,
+            old: Optional[int],
+            new: Optional[int],
+            session: AsyncSession
+    ) -> bool:
+        """
+        Передвинуть отметку последнего выгруженного проекта.
+
+        Отметка меняется, только если она не изменилась с момента
+        чтения, поэтому параллельные отчёты не выгрузят проекты дважды.
+        """
+
+        moved = await session.execute(
+            update(self.model)
+            .where(
+                self.model.id == spreadsheet_id,
+                self.model.last_completion_id.is_not_distinct_from(old)
+            )
+            .values(last_completion_id=new)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return moved.rowcount == 1
+
+    async def reserve_sheet(
+            self,
+            session: AsyncSession
+    ) -> Optional[tuple[str, int]]:
+        """
+        Занять id следующего листа в текущей таблице.
+
+        Счётчик листов увеличивается условным UPDATE,
+        поэтому параллельные отчёты не получат один и тот же лист.
+        Таблицы инкрементального отчёта не используются:
+        у них единственный лист, который дописывается на месте.
+        """
+
+        while True:
+            spreadsheet = await session.execute(
+                select(self.model.id, self.model.spreadsheet_id,
+                       self.model.sheets_count)
+                .where(self.model.incremental.is_(False))
+                .order_by(self.model.id.desc()).limit(1)
+            )
+            spreadsheet = spreadsheet.first()
+            if spreadsheet is None:
+                return None
+            reserved = await session.execute(
+                update(self.model)
+                .where(
+                    self.model.id == spreadsheet.id,
+                    self.model.sheets_count == spreadsheet.sheets_count
+                )
+                .values(sheets_count=self.model.sheets_count + 1)
+            )
+            await session.commit()
+            if reserved.rowcount == 1:
+                return spreadsheet.spreadsheet_id, spreadsheet.sheets_count
+
+
+report_spreadsheet_crud = CRUDReportSpreadsheet()
@@ -14,3 +14,21 @@ class MaxColumnsExceededError(Exception):
     превышает допустимое значение.
     """
     pass
+
+
+class InvestConflictError(Exception):
+    """
+    Исключение для случаев,
+    когда распределить средства не удалось
+    из-за параллельных изменений тех же объектов.
+    """
+    pass
+
+
+class BulkPayloadError(Exception):
+    """
+    Исключение для случаев,
+    когда тело пакетного запроса не удаётся
+    разобрать как JSON-массив или NDJSON.
+    """
+    pass
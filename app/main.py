@@ -2,7 +2,44 @@ from fastapi import FastAPI
 
 from app.api.routers import main_router
 from app.core.db import settings
+from app.core.google_client import close_google_client, open_google_client
+from app.services.invest_queue import invest_queue
+from app.services.report_jobs import report_jobs
 
 app = FastAPI(title=settings.app_title)
 
 app.include_router(main_router)
+
+
+@app.on_event('startup')
+async def start_invest_queue():
+    if settings.invest_deferred:
+        invest_queue.wake()
+        invest_queue.start()
+
+
+@app.on_event('shutdown')
+async def stop_invest_queue():
+    await invest_queue.stop()
+
+
+@app.on_event('startup')
+async def start_report_jobs():
+    await report_jobs.recover()
+
+
+@app.on_event('shutdown')
+async def stop_report_jobs():
+    await report_jobs.stop()
+
+
+@app.on_event('startup')
+async def start_google_client():
+    await open_google_client()
+
+
+# Регистрируется после stop_report_jobs: клиент Google закрывается,
+# когда уже формируемые отчёты завершились.
+@app.on_event('shutdown')
+async def stop_google_client():
+    await close_google_client()
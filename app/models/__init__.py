@@ -1,3 +1,6 @@
 from .user import User  # noqa
 from .donation import Donation  # noqa
 from .charity_project import CharityProject  # noqa
+from .report_spreadsheet import ReportSpreadsheet  # noqa
+from .project_completion import ProjectCompletion  # noqa
+from .report_job import ReportJob  # noqa
@@ -1,8 +1,9 @@
 from datetime import datetime
 
 from sqlalchemy import (
-    Column, Integer, CheckConstraint, Boolean, DateTime
+    Column, Integer, CheckConstraint, Boolean, DateTime, Index, column
 )
+from sqlalchemy.orm import declared_attr
 
 from app.constants import INVESTED_AMOUNT_INIT
 from app.core.db import Base
@@ -16,9 +17,23 @@ class BaseProjectModel(Base):
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.now)
     close_date = Column(DateTime)
+    version = Column(Integer, nullable=False, server_default='1')
 
-    __table_args__ = (
-        CheckConstraint(
-            'full_amount > 0',
-            name='check_full_amount_positive'),
-    )
+    @declared_attr
+    def __mapper_args__(cls):
+        return {'version_id_col': cls.version}
+
+    @declared_attr
+    def __table_args__(cls):
+        is_open = column('fully_invested').is_(False)
+        return (
+            CheckConstraint(
+                'full_amount > 0',
+                name='check_full_amount_positive'),
+            Index(
+                f'ix_{cls.__tablename__}_open_create_date',
+                'create_date', 'id',
+                sqlite_where=is_open,
+                postgresql_where=is_open,
+            ),
+        )
@@ -4,7 +4,7 @@ from app.models.base_model import BaseProjectModel
 
 
 class Donation(BaseProjectModel):
-    user_id = Column(Integer, ForeignKey('user.id'))
+    user_id = Column(Integer, ForeignKey('user.id'), index=True)
     comment = Column(Text)
 
     def __repr__(self):
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String, Text
+
+from app.core.db import Base
+
+
+class ReportJob(Base):
+    status = Column(String(20), nullable=False, default='pending')
+    spreadsheet_url = Column(String(200))
+    error = Column(Text)
+    create_date = Column(DateTime, default=datetime.now)
+    finish_date = Column(DateTime)
+
+    def __repr__(self):
+        return f'{self.id} {self.status}'
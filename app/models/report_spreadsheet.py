@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+from app.core.db import Base
+
+
+class ReportSpreadsheet(Base):
+    spreadsheet_id = Column(String(100), unique=True, nullable=False)
+    sheets_count = Column(Integer, nullable=False, default=1)
+    create_date = Column(DateTime, default=datetime.now)
+    incremental = Column(Boolean, nullable=False, default=False)
+    last_completion_id = Column(Integer)
+
+    def __repr__(self):
+        return f'{self.spreadsheet_id} листов: {self.sheets_count}'
@@ -0,0 +1,13 @@
+from typing import Any, Generic, Optional, TypeVar
+
+from pydantic.generics import GenericModel
+
+ResultT = TypeVar('ResultT')
+
+
+class BulkItemResult(GenericModel, Generic[ResultT]):
+    """Результат одного элемента пакетного запроса."""
+
+    index: int
+    created: Optional[ResultT]
+    errors: Optional[list[dict[str, Any]]]
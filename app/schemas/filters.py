@@ -0,0 +1,36 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Extra, conint
+
+from app.constants import MAX_PAGE_LIMIT
+
+
+class ListFilter(BaseModel):
+    limit: Optional[conint(ge=1, le=MAX_PAGE_LIMIT)]
+    after: Optional[int]
+    fully_invested: Optional[bool]
+    create_date_from: Optional[datetime]
+    create_date_to: Optional[datetime]
+
+    class Config:
+        extra = Extra.forbid
+
+
+class DonationListFilter(ListFilter):
+    user_id: Optional[int]
+
+
+class ReportFilter(BaseModel):
+    top: Optional[conint(ge=1)]
+    closed_from: Optional[datetime]
+    closed_to: Optional[datetime]
+
+    class Config:
+        extra = Extra.forbid
+
+
+class StreamFormat(str, Enum):
+    ndjson = 'ndjson'
+    json = 'json'
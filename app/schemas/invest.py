@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class RebalanceResult(BaseModel):
+    donations: int
+    projects: int
+    closed_donations: int
+    closed_projects: int
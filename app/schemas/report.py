@@ -0,0 +1,35 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExportFormat(str, Enum):
+    csv = 'csv'
+    xlsx = 'xlsx'
+    parquet = 'parquet'
+
+
+class ExportFile(BaseModel):
+    file_name: str
+    url: str
+
+
+class ReportJobStatus(str, Enum):
+    pending = 'pending'
+    running = 'running'
+    done = 'done'
+    failed = 'failed'
+
+
+class ReportJobDB(BaseModel):
+    id: int
+    status: ReportJobStatus
+    spreadsheet_url: Optional[str]
+    error: Optional[str]
+    create_date: datetime
+    finish_date: Optional[datetime]
+
+    class Config:
+        orm_mode = True
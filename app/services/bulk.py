@@ -0,0 +1,93 @@
+import json
+from typing import Any, AsyncIterator, Type
+
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+
+from app.constants import BULK_MAX_ITEMS
+from app.exceptions import BulkPayloadError
+from app.schemas.filters import StreamFormat
+from app.services.streaming import STREAM_MEDIA_TYPES
+
+NDJSON_MEDIA_TYPE = STREAM_MEDIA_TYPES[StreamFormat.ndjson]
+
+
+async def ndjson_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Разбирать NDJSON по мере получения тела запроса."""
+
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+async def read_bulk_items(request: Request) -> list:
+    """
+    Прочитать элементы пакетного запроса.
+
+    Тело - JSON-массив или, с типом application/x-ndjson,
+    по одному JSON-объекту на строку. Элементов не больше
+    BULK_MAX_ITEMS.
+    """
+
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith(NDJSON_MEDIA_TYPE):
+            items = []
+            async for item in ndjson_items(request.stream()):
+                items.append(item)
+                if len(items) > BULK_MAX_ITEMS:
+                    break
+        else:
+            items = json.loads(await request.body())
+    except ValueError as error:
+        raise BulkPayloadError(f'Тело запроса не разобрано: {error}')
+    if not isinstance(items, list):
+        raise BulkPayloadError('Ожидается JSON-массив объектов.')
+    if len(items) > BULK_MAX_ITEMS:
+        raise BulkPayloadError(
+            f'В пакете не может быть больше {BULK_MAX_ITEMS} элементов.'
+        )
+    return items
+
+
+def parse_bulk_items(
+        items: list,
+        schema: Type[BaseModel]
+) -> tuple[dict[int, BaseModel], dict[int, list]]:
+    """
+    Проверить элементы пакета по схеме.
+
+    Возвращает корректные элементы и ошибки остальных,
+    в обоих случаях по номеру элемента в пакете.
+    """
+
+    objs_in, errors = {}, {}
+    for index, item in enumerate(items):
+        try:
+            objs_in[index] = schema.parse_obj(item)
+        except ValidationError as error:
+            errors[index] = error.errors()
+    return objs_in, errors
+
+
+def bulk_results(
+        count: int,
+        created: dict[int, Any],
+        errors: dict[int, list]
+) -> list[dict]:
+    """Собрать ответ: по одному результату на элемент пакета."""
+
+    return [
+        {
+            'index': index,
+            'created': created.get(index),
+            'errors': errors.get(index),
+        }
+        for index in range(count)
+    ]
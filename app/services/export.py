@@ -0,0 +1,196 @@
+import asyncio
+import csv
+import io
+import logging
+import uuid
+from contextlib import suppress
+from datetime import datetime
+from importlib.util import find_spec
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import REPORT_CHUNK_ROWS
+from app.crud.charity_project import project_crud
+from app.schemas.filters import ReportFilter
+from app.schemas.report import ExportFormat
+from app.services.google_api import BASE_TABLE_VALUES, project_row
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = '.part'
+FAILED_SUFFIX = '.failed'
+EXPORT_HEADER = [*BASE_TABLE_VALUES[-1], 'Время сбора, секунд']
+PARQUET_COLUMNS = ['name', 'duration', 'description', 'duration_seconds']
+
+EXPORT_MODULES = {
+    ExportFormat.xlsx: 'openpyxl',
+    ExportFormat.parquet: 'pyarrow',
+}
+
+
+def export_available(file_format: ExportFormat) -> bool:
+    """Установлена ли библиотека, нужная для формата."""
+
+    module = EXPORT_MODULES.get(file_format)
+    return module is None or find_spec(module) is not None
+
+
+def partial_path(path: Path) -> Path:
+    """Временный файл, в который пишется выгрузка."""
+
+    return path.with_name(f'{path.name}{PARTIAL_SUFFIX}')
+
+
+def failed_path(path: Path) -> Path:
+    """Файл с текстом ошибки неудавшейся выгрузки."""
+
+    return path.with_name(f'{path.name}{FAILED_SUFFIX}')
+
+
+def is_service_file(file_name: str) -> bool:
+    """Служебный файл выгрузки, который нельзя отдавать клиенту."""
+
+    return file_name.endswith((PARTIAL_SUFFIX, FAILED_SUFFIX))
+
+
+def export_file_name(file_format: ExportFormat) -> str:
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    return (
+        f'closed_projects_{timestamp}_{uuid.uuid4().hex[:8]}'
+        f'.{file_format.value}'
+    )
+
+
+async def report_chunks(
+        projects: AsyncIterator[Row]
+) -> AsyncIterator[list[list]]:
+    """Собрать строки отчёта в пакеты по REPORT_CHUNK_ROWS."""
+
+    chunk = []
+    async for project in projects:
+        chunk.append(project_row(project, sort_key=True))
+        if len(chunk) == REPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_text(rows: list[list]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def csv_chunks(projects: AsyncIterator[Row]) -> AsyncIterator[str]:
+    """Отдавать CSV по мере чтения строк из курсора."""
+
+    yield csv_text([EXPORT_HEADER])
+    async for chunk in report_chunks(projects):
+        yield csv_text(chunk)
+
+
+class CsvExport:
+
+    def __init__(self, path: Path):
+        self.file = path.open('w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_HEADER)
+
+    def write(self, rows: list[list]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class XlsxExport:
+
+    def __init__(self, path: Path):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Отчёт')
+        self.sheet.append(EXPORT_HEADER)
+
+    def write(self, rows: list[list]) -> None:
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self) -> None:
+        self.workbook.save(self.path)
+
+
+class ParquetExport:
+
+    def __init__(self, path: Path):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            ('name', pyarrow.string()),
+            ('duration', pyarrow.string()),
+            ('description', pyarrow.string()),
+            ('duration_seconds', pyarrow.int64()),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: list[list]) -> None:
+        self.writer.write_table(self.pyarrow.Table.from_arrays(
+            [list(column) for column in zip(*rows)], schema=self.schema
+        ))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+EXPORT_WRITERS = {
+    ExportFormat.csv: CsvExport,
+    ExportFormat.xlsx: XlsxExport,
+    ExportFormat.parquet: ParquetExport,
+}
+
+
+async def export_closed_projects(
+        file_format: ExportFormat,
+        path: Path,
+        session: AsyncSession,
+        report_filter: Optional[ReportFilter] = None
+) -> None:
+    """
+    Выгрузить отчёт о закрытых проектах в файл.
+
+    Строки читаются из курсора пакетами, запись в файл
+    выполняется в отдельном потоке. Файл пишется под временным
+    именем и переименовывается, только когда полностью готов.
+    Если выгрузка не удалась, рядом остаётся файл с текстом
+    ошибки, который показывается при попытке скачать отчёт.
+    """
+
+    partial = partial_path(path)
+    writer = None
+    try:
+        writer = await asyncio.to_thread(
+            EXPORT_WRITERS[file_format], partial
+        )
+        async for chunk in report_chunks(
+                project_crud.stream_completed_projects(
+                    session, report_filter, ordered=True
+                )
+        ):
+            await asyncio.to_thread(writer.write, chunk)
+        await asyncio.to_thread(writer.close)
+    except Exception as error:
+        logger.exception('Ошибка выгрузки отчёта %s', path.name)
+        if writer is not None:
+            with suppress(Exception):
+                await asyncio.to_thread(writer.close)
+        partial.unlink(missing_ok=True)
+        failed_path(path).write_text(str(error), encoding='utf-8')
+        return
+    partial.rename(path)
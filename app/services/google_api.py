@@ -1,18 +1,22 @@
+import asyncio
 from datetime import datetime
 import copy
+import json
 from string import ascii_uppercase
+from typing import Awaitable
 
 from aiogoogle import Aiogoogle
 
 from app.core.config import settings
 from app.constants import (
     SECONDS_OF_ONE_DAY, SECONDS_OF_HOUR,
-    MINUTES_OF_HOUR, FORMAT, MAX_ROWS, MAX_COLUMNS,
-    SPREADSHEET_URL
+    MINUTES_OF_HOUR, FORMAT, MAX_ROWS, MAX_COLUMNS, MAX_CELLS,
+    REPORT_CHUNK_ROWS, REPORT_PAYLOAD_LIMIT, SPREADSHEET_URL
 )
 from app.exceptions import (
     MaxColumnsExceededError, MaxRowsExceededError
 )
+from app.services.google_discovery import discovery_cache
 
 BASE_TABLE_VALUES = [
     ['Отчёт от', ''],
@@ -35,6 +39,8 @@ SPREADSHEET_BODY_TEMPLATE = {
     ]
 }
 
+SORT_KEY_COLUMN = len(BASE_TABLE_VALUES[-1])
+
 PERMISSIONS_BODY = {
     'type': 'user',
     'role': 'writer',
@@ -42,51 +48,68 @@ PERMISSIONS_BODY = {
 }
 
 
-def difference_days(days_diff: float) -> str:
-    """Привести к формату врменной отчет."""
-
-    difference_in_days = days_diff
-    days = int(difference_in_days)
-    fractional_days = difference_in_days - days
-
-    total_seconds = fractional_days * SECONDS_OF_ONE_DAY
-
-    hours = int(total_seconds // SECONDS_OF_HOUR)
-    total_seconds %= SECONDS_OF_HOUR
+def difference_days(duration_seconds: int) -> str:
+    """Привести длительность сбора в секундах к формату отчёта."""
 
-    minutes = int(total_seconds // MINUTES_OF_HOUR)
-    seconds = float(total_seconds % MINUTES_OF_HOUR)
+    days, seconds = divmod(duration_seconds, SECONDS_OF_ONE_DAY)
+    hours, seconds = divmod(seconds, SECONDS_OF_HOUR)
+    minutes, seconds = divmod(seconds, MINUTES_OF_HOUR)
     day_word = "day" if days == 1 else "days"
     formatted_time_difference = (f"{days} {day_word}, "
-                                 f"{hours:01}:{minutes:02}:{seconds:02.6f}")
+                                 f"{hours:01}:{minutes:02}:"
+                                 f"{float(seconds):02.6f}")
     return formatted_time_difference
 
 
-async def spreadsheets_update_value(
-        spreadsheet_id: str,
+def project_row(project, sort_key: bool = False) -> list:
+    """
+    Строка отчёта по проекту.
+
+    С `sort_key` в конец добавляется длительность сбора в секундах:
+    по этому скрытому числовому столбцу отчёт сортируется в таблице.
+    """
+
+    row = [
+        str(project['name']),
+        difference_days(project['duration_seconds']),
+        str(project['description'])
+    ]
+    if sort_key:
+        row.append(project['duration_seconds'])
+    return row
+
+
+def cell_value(value) -> dict:
+    """Значение ячейки для updateCells и appendCells."""
+
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': value}}
+
+
+def cell_rows(rows: list[list]) -> list[dict]:
+    return [{'values': [cell_value(value) for value in row]} for row in rows]
+
+
+def build_table_values(
         closed_projects: list,
-        wrapper_services: Aiogoogle
-) -> None:
-    """Заполнить таблицу данными."""
+        sort_key: bool = False
+) -> list[list]:
+    """Собрать строки отчёта и проверить размеры таблицы."""
+
     now_date_time = datetime.now().strftime(FORMAT)
-    service = await wrapper_services.discover('sheets', 'v4')
     table_values = copy.deepcopy(BASE_TABLE_VALUES)
     table_values[0][1] = now_date_time
 
     for project in closed_projects:
-        new_row = [
-            str(project['name']),
-            difference_days(project['duration_days']),
-            str(project['description'])
-        ]
-        table_values.append(new_row)
+        table_values.append(project_row(project, sort_key))
 
     total_rows = len(table_values)
 
-    if total_rows > MAX_ROWS:
+    if total_rows * MAX_COLUMNS > MAX_CELLS:
         raise MaxRowsExceededError(
-            f"Превышено максимальное количество строк "
-            f"({MAX_ROWS}). Текущие строки: {total_rows}."
+            f"Превышено максимальное количество ячеек "
+            f"({MAX_CELLS}). Текущие строки: {total_rows}."
         )
 
     for row in table_values:
@@ -95,19 +118,135 @@ async def spreadsheets_update_value(
                 f"Превышено максимальное количество столбцов "
                 f"({MAX_COLUMNS}) в строке: {row}."
             )
+    return table_values
 
-    update_body = {
-        'majorDimension': 'ROWS',
-        'values': table_values
-    }
 
-    await wrapper_services.as_service_account(
-        service.spreadsheets.values.update(
-            spreadsheetId=spreadsheet_id,
-            range=f'A1:{ascii_uppercase[MAX_COLUMNS - 1]}{MAX_ROWS}',
-            valueInputOption='USER_ENTERED',
-            json=update_body
+def split_into_batches(
+        table_values: list[list[str]]
+) -> list[list[tuple[int, list]]]:
+    """
+    Разбить строки отчёта на запросы к API.
+
+    Строки делятся на диапазоны по REPORT_CHUNK_ROWS строк,
+    диапазоны группируются в запросы так, чтобы тело запроса
+    не превышало REPORT_PAYLOAD_LIMIT байт.
+    Каждый диапазон задаётся номером первой строки и строками.
+    """
+
+    batches, batch, batch_size = [], [], 0
+    chunk, chunk_start = [], 1
+    for row_number, row in enumerate(table_values, start=1):
+        row_size = len(json.dumps(row))
+        if batch_size + row_size > REPORT_PAYLOAD_LIMIT and (
+                batch or chunk
+        ):
+            if chunk:
+                batch.append((chunk_start, chunk))
+            batches.append(batch)
+            batch, batch_size = [], 0
+            chunk, chunk_start = [], row_number
+        elif len(chunk) == REPORT_CHUNK_ROWS:
+            batch.append((chunk_start, chunk))
+            chunk, chunk_start = [], row_number
+        chunk.append(row)
+        batch_size += row_size
+    if chunk:
+        batch.append((chunk_start, chunk))
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def value_ranges(
+        batch: list[tuple[int, list]],
+        sheet_title: str = ''
+) -> list[dict]:
+    """Преобразовать диапазоны в ValueRange для values.batchUpdate."""
+
+    prefix = f"'{sheet_title}'!" if sheet_title else ''
+    last_column = ascii_uppercase[MAX_COLUMNS - 1]
+    return [
+        {
+            'range': (
+                f'{prefix}A{start}:{last_column}{start + len(rows) - 1}'
+            ),
+            'majorDimension': 'ROWS',
+            'values': rows
+        }
+        for start, rows in batch
+    ]
+
+
+async def spreadsheets_write_batches(
+        spreadsheet_id: str,
+        batches: list[list[tuple[int, list]]],
+        wrapper_services: Aiogoogle,
+        sheet_title: str = ''
+) -> None:
+    """Записать диапазоны: один вызов values.batchUpdate на пакет."""
+
+    service = await discovery_cache.discover(
+        wrapper_services, 'sheets', 'v4'
+    )
+    for batch in batches:
+        await wrapper_services.as_service_account(
+            service.spreadsheets.values.batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                json={
+                    'valueInputOption': 'USER_ENTERED',
+                    'data': value_ranges(batch, sheet_title)
+                }
+            )
+        )
+
+
+async def spreadsheets_update_value(
+        spreadsheet_id: str,
+        closed_projects: list,
+        wrapper_services: Aiogoogle,
+        sort_key: bool = False
+) -> None:
+    """
+    Заполнить таблицу данными.
+
+    Если строк больше, чем в сетке нового документа,
+    сетка сначала расширяется до фактического числа строк;
+    тем же вызовом скрывается столбец ключа сортировки.
+    """
+    service = await discovery_cache.discover(
+        wrapper_services, 'sheets', 'v4'
+    )
+    table_values = build_table_values(closed_projects, sort_key)
+
+    requests = []
+    if len(table_values) > MAX_ROWS:
+        requests.append({'updateSheetProperties': {
+            'properties': {
+                'sheetId': 0,
+                'gridProperties': {'rowCount': len(table_values)}
+            },
+            'fields': 'gridProperties.rowCount'
+        }})
+    if sort_key:
+        requests.append({'updateDimensionProperties': {
+            'range': {
+                'sheetId': 0,
+                'dimension': 'COLUMNS',
+                'startIndex': SORT_KEY_COLUMN,
+                'endIndex': SORT_KEY_COLUMN + 1
+            },
+            'properties': {'hiddenByUser': True},
+            'fields': 'hiddenByUser'
+        }})
+    if requests:
+        await wrapper_services.as_service_account(
+            service.spreadsheets.batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                json={'requests': requests}
+            )
         )
+    await spreadsheets_write_batches(
+        spreadsheet_id, split_into_batches(table_values), wrapper_services
     )
 
 
@@ -115,7 +254,9 @@ async def spreadsheets_create(wrapper_services: Aiogoogle) -> tuple:
     """Создать  документ с таблицами."""
 
     now_date_time = datetime.now().strftime(FORMAT)
-    service = await wrapper_services.discover('sheets', 'v4')
+    service = await discovery_cache.discover(
+        wrapper_services, 'sheets', 'v4'
+    )
     spreadsheet_body = copy.deepcopy(SPREADSHEET_BODY_TEMPLATE)
     spreadsheet_body['properties']['title'] = f'Отчёт на {now_date_time}'
     response = await wrapper_services.as_service_account(
@@ -133,10 +274,176 @@ async def set_user_permissions(
 ) -> None:
     """Предоставить права доступа к созданному документу."""
 
-    service = await wrapper_services.discover('drive', 'v3')
+    service = await discovery_cache.discover(
+        wrapper_services, 'drive', 'v3'
+    )
     await wrapper_services.as_service_account(
         service.permissions.create(
             fileId=spreadsheet_id,
             json=PERMISSIONS_BODY,
             fields="id"
         ))
+
+
+async def spreadsheets_report(
+        closed_projects: Awaitable[list],
+        wrapper_services: Aiogoogle,
+        sort_key: bool = False
+) -> tuple[str, str]:
+    """
+    Сформировать отчёт в новой гугл-таблице.
+
+    Запрос к БД и создание документа не зависят друг от друга,
+    а выдача прав и запись данных требуют только id документа,
+    поэтому каждая пара выполняется параллельно.
+    """
+
+    closed_projects, (spreadsheet_id, spreadsheet_url) = await asyncio.gather(
+        closed_projects, spreadsheets_create(wrapper_services)
+    )
+    await asyncio.gather(
+        set_user_permissions(spreadsheet_id, wrapper_services),
+        spreadsheets_update_value(
+            spreadsheet_id, closed_projects, wrapper_services, sort_key
+        )
+    )
+    return spreadsheet_id, spreadsheet_url
+
+
+async def sheets_over_limit(
+        spreadsheet_id: str,
+        service,
+        wrapper_services: Aiogoogle
+) -> list[int]:
+    """
+    Самые старые листы, которые нужно удалить перед добавлением нового.
+
+    Листы берутся из самой таблицы, а не вычисляются по счётчику:
+    если добавить лист не удалось, занятый номер остаётся пропуском,
+    и удаление несуществующего листа отклонило бы весь batchUpdate.
+    """
+
+    response = await wrapper_services.as_service_account(
+        service.spreadsheets.get(
+            spreadsheetId=spreadsheet_id,
+            fields='sheets.properties.sheetId'
+        )
+    )
+    sheet_ids = sorted(
+        sheet['properties']['sheetId'] for sheet in response['sheets']
+    )
+    excess = len(sheet_ids) + 1 - settings.google_report_sheets_limit
+    return sheet_ids[:max(excess, 0)]
+
+
+async def spreadsheets_add_sheet(
+        spreadsheet_id: str,
+        sheet_id: int,
+        closed_projects: list,
+        wrapper_services: Aiogoogle
+) -> str:
+    """
+    Добавить отчёт новым листом в существующую таблицу.
+
+    Лист с сеткой по числу строк создаётся и заполняется первым
+    пакетом строк в одном вызове batchUpdate; в нём же удаляются
+    самые старые листы сверх лимита. Остальные пакеты, если отчёт
+    не поместился в один запрос, дописываются через values.batchUpdate.
+    """
+
+    service = await discovery_cache.discover(
+        wrapper_services, 'sheets', 'v4'
+    )
+    table_values = build_table_values(closed_projects)
+    sheet_title = f'Отчёт {sheet_id} на {table_values[0][1]}'
+    first_batch, *batches = split_into_batches(table_values)
+    requests = [
+        {'addSheet': {'properties': {
+            'sheetId': sheet_id,
+            'title': sheet_title,
+            'gridProperties': {
+                'rowCount': len(table_values),
+                'columnCount': MAX_COLUMNS
+            }
+        }}},
+        {'updateCells': {
+            'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+            'rows': cell_rows(
+                [row for _, rows in first_batch for row in rows]
+            ),
+            'fields': 'userEnteredValue'
+        }}
+    ]
+    if sheet_id >= settings.google_report_sheets_limit:
+        requests.extend(
+            {'deleteSheet': {'sheetId': old_sheet_id}}
+            for old_sheet_id in await sheets_over_limit(
+                spreadsheet_id, service, wrapper_services
+            )
+        )
+    await wrapper_services.as_service_account(
+        service.spreadsheets.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            json={'requests': requests}
+        )
+    )
+    await spreadsheets_write_batches(
+        spreadsheet_id, batches, wrapper_services, sheet_title
+    )
+    return f'{SPREADSHEET_URL}{spreadsheet_id}#gid={sheet_id}'
+
+
+async def spreadsheets_append_sorted(
+        spreadsheet_id: str,
+        closed_projects: list,
+        wrapper_services: Aiogoogle
+) -> None:
+    """
+    Дописать проекты в отчёт и пересортировать его в таблице.
+
+    Строки добавляются через appendCells пакетами не больше
+    REPORT_PAYLOAD_LIMIT байт; последний вызов batchUpdate также
+    обновляет дату отчёта и сортирует данные по скрытому столбцу.
+    """
+
+    service = await discovery_cache.discover(
+        wrapper_services, 'sheets', 'v4'
+    )
+    batches = split_into_batches(
+        [project_row(project, sort_key=True) for project in closed_projects]
+    )
+    for number, batch in enumerate(batches, start=1):
+        requests = [
+            {'appendCells': {
+                'sheetId': 0,
+                'rows': cell_rows(rows),
+                'fields': 'userEnteredValue'
+            }}
+            for _, rows in batch
+        ]
+        if number == len(batches):
+            requests += [
+                {'updateCells': {
+                    'start': {'sheetId': 0, 'rowIndex': 0, 'columnIndex': 1},
+                    'rows': cell_rows([[datetime.now().strftime(FORMAT)]]),
+                    'fields': 'userEnteredValue'
+                }},
+                {'sortRange': {
+                    'range': {
+                        'sheetId': 0,
+                        'startRowIndex': len(BASE_TABLE_VALUES),
+                        'startColumnIndex': 0,
+                        'endColumnIndex': SORT_KEY_COLUMN + 1
+                    },
+                    'sortSpecs': [{
+                        'dimensionIndex': SORT_KEY_COLUMN,
+                        'sortOrder': 'ASCENDING'
+                    }]
+                }}
+            ]
+        await wrapper_services.as_service_account(
+            service.spreadsheets.batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                json={'requests': requests}
+            )
+        )
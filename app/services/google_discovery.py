@@ -0,0 +1,97 @@
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from aiogoogle import Aiogoogle
+from aiogoogle.resource import GoogleAPI
+
+from app.core.config import settings
+
+
+class DiscoveryCache:
+    """
+    Общий для процесса кэш discovery-документов Google API.
+
+    Документы хранятся в памяти и, если задан каталог, на диске;
+    по истечении `ttl` секунд документ запрашивается заново.
+    """
+
+    def __init__(self, ttl: int, cache_dir: Optional[str] = None):
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.services: dict[tuple[str, str], tuple[float, GoogleAPI]] = {}
+
+    def file_path(self, api_name: str, api_version: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f'{api_name}.{api_version}.json'
+
+    def put(
+            self,
+            document: dict,
+            expires_at: Optional[float] = None
+    ) -> GoogleAPI:
+        """Положить документ в память и построить по нему сервис."""
+
+        service = GoogleAPI(document)
+        self.services[(document['name'], document['version'])] = (
+            expires_at or time.time() + self.ttl, service
+        )
+        return service
+
+    def read_file(
+            self,
+            api_name: str,
+            api_version: str
+    ) -> Optional[GoogleAPI]:
+        path = self.file_path(api_name, api_version)
+        if path is None or not path.exists():
+            return None
+        expires_at = path.stat().st_mtime + self.ttl
+        if expires_at <= time.time():
+            return None
+        return self.put(json.loads(path.read_text()), expires_at)
+
+    def write_file(self, document: dict) -> None:
+        path = self.file_path(document['name'], document['version'])
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document))
+
+    def get(self, api_name: str, api_version: str) -> Optional[GoogleAPI]:
+        """Получить сервис из памяти или с диска, если он не устарел."""
+
+        cached = self.services.get((api_name, api_version))
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+        return self.read_file(api_name, api_version)
+
+    def seed(self, path: str) -> GoogleAPI:
+        """Загрузить документ из файла, например для работы без сети."""
+
+        return self.put(json.loads(Path(path).read_text()))
+
+    def clear(self) -> None:
+        self.services.clear()
+
+    async def discover(
+            self,
+            wrapper_services: Aiogoogle,
+            api_name: str,
+            api_version: str
+    ) -> GoogleAPI:
+        """Аналог `Aiogoogle.discover`, идущий в сеть только при промахе."""
+
+        service = self.get(api_name, api_version)
+        if service is None:
+            service = await wrapper_services.discover(api_name, api_version)
+            self.write_file(service.discovery_document)
+            service = self.put(service.discovery_document)
+        return service
+
+
+discovery_cache = DiscoveryCache(
+    settings.google_discovery_ttl, settings.google_discovery_cache_dir
+)
@@ -1,7 +1,23 @@
+import asyncio
+import random
 from datetime import datetime
-from typing import TypeVar
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.constants import INVEST_RETRY_DELAY
+from app.core.config import settings
+from app.crud import donation_crud, project_crud
+from app.crud.base import CRUDBase
+from app.exceptions import InvestConflictError
+from app.models import CharityProject, Donation, User
+from app.schemas.invest import RebalanceResult
 
 ModelBase = TypeVar('ModelBase')
+T = TypeVar('T')
 
 
 def calculate_investment_amount(
@@ -24,19 +40,23 @@ def update_investment_status(
         obj.close_date = datetime.now()
 
 
-def invest_processing(
+async def invest_processing_stream(
         source: ModelBase,
-        targets: list[ModelBase]
+        targets: AsyncIterator[ModelBase]
 ) -> list[ModelBase]:
-    """Распределить средства по принципу First In, First Out (FIFO)."""
+    """
+    Распределить средства по FIFO, получая цели из асинхронного потока.
 
-    updated_objects = []
+    Очередная цель запрашивается только пока у источника
+    остаются свободные средства.
+    """
 
-    for target in targets:
+    updated_objects = []
 
-        if source.fully_invested:
-            break
+    if source.fully_invested:
+        return updated_objects
 
+    async for target in targets:
         invest_amount = calculate_investment_amount(source, target)
 
         update_investment_status(source, invest_amount)
@@ -44,4 +64,209 @@ def invest_processing(
 
         updated_objects.extend([source, target])
 
+        if source.fully_invested:
+            break
+
+    return updated_objects
+
+
+async def invest_processing_sql(
+        source: ModelBase,
+        target_crud: CRUDBase,
+        session: AsyncSession
+) -> None:
+    """Распределить средства источника одним запросом на стороне БД."""
+
+    if source.fully_invested:
+        return
+
+    invest_amount = await target_crud.invest_bulk(
+        source.full_amount - source.invested_amount, session
+    )
+    update_investment_status(source, invest_amount)
+
+
+async def run_invest_processing(
+        source: ModelBase,
+        target_crud: CRUDBase,
+        session: AsyncSession
+) -> None:
+    """Распределить средства нового объекта выбранным движком."""
+
+    if settings.invest_engine == 'sql':
+        await invest_processing_sql(source, target_crud, session)
+        return
+
+    targets = target_crud.iter_objects_for_invest_processing(
+        session=session
+    )
+    for obj in await invest_processing_stream(source, targets):
+        session.add(obj)
+
+
+def is_invest_conflict(error: Exception) -> bool:
+    """Вызвана ли ошибка параллельной записью тех же строк."""
+
+    if isinstance(error, StaleDataError):
+        return True
+    return (
+        isinstance(error, OperationalError) and
+        'database is locked' in str(error.orig)
+    )
+
+
+async def commit_with_retry(
+        session: AsyncSession,
+        action: Callable[[], Awaitable[T]]
+) -> T:
+    """
+    Выполнить распределение и зафиксировать транзакцию.
+
+    Если те же строки параллельно изменила другая транзакция
+    (не совпала версия или SQLite отказал в блокировке),
+    транзакция откатывается и повторяется.
+    """
+
+    for attempt in range(settings.invest_retries):
+        try:
+            result = await action()
+            await session.commit()
+        except (StaleDataError, OperationalError) as error:
+            if not is_invest_conflict(error):
+                raise
+            await session.rollback()
+            await asyncio.sleep(
+                random.uniform(0, INVEST_RETRY_DELAY * (attempt + 1))
+            )
+            continue
+        return result
+
+    raise InvestConflictError(
+        'Не удалось распределить средства: '
+        'объекты одновременно изменяются другими запросами.'
+    )
+
+
+async def create_with_invest_processing(
+        crud: CRUDBase,
+        obj_in: BaseModel,
+        target_crud: CRUDBase,
+        session: AsyncSession,
+        user: Optional[User] = None
+) -> ModelBase:
+    """Создать объект и распределить его средства в одной транзакции."""
+
+    # id читается до первой попытки: откат при конфликте сбрасывает
+    # загруженного в той же сессии пользователя.
+    user_id = None if user is None else user.id
+
+    async def create_and_invest() -> ModelBase:
+        # Без autoflush новый объект не вставляется перед выборкой
+        # встречных объектов и попадает в БД одним INSERT при commit,
+        # уже с итоговыми суммами, без дополнительного UPDATE.
+        with session.no_autoflush:
+            new_obj = await crud.create(
+                obj_in, session, commit=False, user_id=user_id
+            )
+            await run_invest_processing(new_obj, target_crud, session)
+        return new_obj
+
+    return await commit_with_retry(session, create_and_invest)
+
+
+async def next_or_none(objects: AsyncIterator[ModelBase]):
+    """Взять следующий объект из потока или None, если он исчерпан."""
+
+    try:
+        return await objects.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def invest_processing_merge(
+        donations: AsyncIterator[ModelBase],
+        projects: AsyncIterator[ModelBase]
+) -> list[ModelBase]:
+    """
+    Свести открытые пожертвования и проекты за один проход.
+
+    Оба потока упорядочены по дате создания; указатель сдвигается
+    на объекте, который закрылся, поэтому проход занимает O(N + M).
+    """
+
+    updated_objects = []
+    donation = await next_or_none(donations)
+    project = await next_or_none(projects)
+
+    while donation is not None and project is not None:
+        invest_amount = calculate_investment_amount(donation, project)
+
+        update_investment_status(donation, invest_amount)
+        update_investment_status(project, invest_amount)
+
+        updated_objects.extend([donation, project])
+
+        if donation.fully_invested:
+            donation = await next_or_none(donations)
+        if project.fully_invested:
+            project = await next_or_none(projects)
+
+    return list(dict.fromkeys(updated_objects))
+
+
+async def settle_open_items(session: AsyncSession) -> list[ModelBase]:
+    """Свести все открытые пожертвования и проекты одним слиянием."""
+
+    updated_objects = await invest_processing_merge(
+        donation_crud.iter_objects_for_invest_processing(session),
+        project_crud.iter_objects_for_invest_processing(session)
+    )
+    session.add_all(updated_objects)
     return updated_objects
+
+
+async def create_bulk_with_invest_processing(
+        crud: CRUDBase,
+        objs_in: list[BaseModel],
+        session: AsyncSession,
+        user: Optional[User] = None
+) -> list[ModelBase]:
+    """
+    Создать объекты пакетом и распределить средства одним проходом.
+
+    Вместо отдельного распределения на каждый объект новые объекты
+    сводятся со всеми открытыми за одно слияние
+    и фиксируются одной транзакцией.
+    """
+
+    user_id = None if user is None else user.id
+
+    async def create_and_settle() -> list[ModelBase]:
+        new_objs = await crud.create_bulk(objs_in, session, user_id=user_id)
+        await settle_open_items(session)
+        return new_objs
+
+    return await commit_with_retry(session, create_and_settle)
+
+
+async def rebalance(session: AsyncSession) -> RebalanceResult:
+    """Распределить все открытые пожертвования по открытым проектам."""
+
+    async def settle() -> RebalanceResult:
+        updated_objects = await settle_open_items(session)
+
+        donations = [
+            obj for obj in updated_objects if isinstance(obj, Donation)
+        ]
+        projects = [
+            obj for obj in updated_objects
+            if isinstance(obj, CharityProject)
+        ]
+        return RebalanceResult(
+            donations=len(donations),
+            projects=len(projects),
+            closed_donations=sum(obj.fully_invested for obj in donations),
+            closed_projects=sum(obj.fully_invested for obj in projects),
+        )
+
+    return await commit_with_retry(session, settle)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.constants import INVEST_QUEUE_MAX_DELAY, INVEST_QUEUE_RETRY_DELAY
+from app.core.db import AsyncSessionLocal
+from app.services.invest_processing import rebalance
+
+logger = logging.getLogger(__name__)
+
+
+class InvestQueue:
+    """
+    Отложенное распределение средств.
+
+    Эндпоинты сохраняют новый объект и будят фоновый воркер.
+    Каждый проход воркера - полное сведение всех открытых
+    пожертвований и проектов (rebalance): новые объекты
+    распределяются по FIFO вместе с остальными, а сколько бы
+    объектов ни накопилось между проходами, их сводит один проход.
+    Поэтому отдельные задания не хранятся, а очередь сводится
+    к флагу «есть что распределить». Если проход не удался,
+    флаг взводится снова и проход повторяется с паузой.
+    При запуске воркер будится сразу: проход сводит всё,
+    что было сохранено, но не распределено до перезапуска.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.pending = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        """Запросить проход распределения."""
+
+        self.pending.set()
+
+    def take_pending(self) -> bool:
+        """Сбросить запрос прохода; вернуть, был ли он."""
+
+        pending = self.pending.is_set()
+        self.pending.clear()
+        return pending
+
+    async def process(self) -> None:
+        """Свести все открытые пожертвования и проекты за один проход."""
+
+        async with self.session_factory() as session:
+            await rebalance(session)
+
+    async def drain(self) -> None:
+        """Выполнить проход, если он был запрошен."""
+
+        if not self.take_pending():
+            return
+        try:
+            await self.process()
+        except Exception:
+            self.wake()
+            raise
+
+    async def run(self) -> None:
+        """
+        Цикл воркера: дождаться запроса и выполнить проход.
+
+        Запросы, пришедшие во время прохода, покрываются
+        следующим проходом. После ошибки пауза перед повтором
+        удваивается до INVEST_QUEUE_MAX_DELAY.
+        """
+
+        failures = 0
+        while True:
+            await self.pending.wait()
+            self.pending.clear()
+            try:
+                await self.process()
+            except asyncio.CancelledError:
+                self.wake()
+                raise
+            except Exception:
+                logger.exception('Ошибка отложенного распределения средств')
+                self.wake()
+                failures += 1
+                await asyncio.sleep(min(
+                    INVEST_QUEUE_RETRY_DELAY * 2 ** (failures - 1),
+                    INVEST_QUEUE_MAX_DELAY
+                ))
+                continue
+            failures = 0
+
+    def start(self) -> None:
+        """Запустить воркер в текущем цикле событий."""
+
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Остановить воркер и выполнить запрошенный проход."""
+
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.worker = None
+        await self.drain()
+
+
+invest_queue = InvestQueue()
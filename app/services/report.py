@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+from typing import AsyncIterator, Optional
+
+from aiogoogle import Aiogoogle
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import SPREADSHEET_URL
+from app.core.config import settings
+from app.crud.charity_project import project_crud
+from app.crud.report_spreadsheet import report_spreadsheet_crud
+from app.schemas.filters import ReportFilter
+from app.services.google_api import (
+    spreadsheets_add_sheet, spreadsheets_append_sorted, spreadsheets_report
+)
+
+
+async def top_projects_heap(
+        projects: AsyncIterator[Row],
+        top: int
+) -> list[Row]:
+    """
+    Выбрать `top` самых быстрых сборов из неупорядоченного потока.
+
+    В куче хранится не больше `top` строк, поэтому память
+    не зависит от числа закрытых проектов.
+    """
+
+    heap = []
+    async for project in projects:
+        item = (-project.duration_seconds, -project.id, project)
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [item[-1] for item in sorted(heap, reverse=True)]
+
+
+async def get_closed_projects(
+        session: AsyncSession,
+        report_filter: Optional[ReportFilter] = None
+) -> list[Row]:
+    """
+    Получить закрытые проекты для отчёта.
+
+    По умолчанию рейтинг читается по индексу с LIMIT; при
+    REPORT_RANKING=heap - для СУБД без подходящего индекса -
+    `top` строк выбирается кучей из потока.
+    """
+
+    if (
+            settings.report_ranking == 'heap' and
+            report_filter is not None and report_filter.top is not None
+    ):
+        return await top_projects_heap(
+            project_crud.stream_completed_projects(session, report_filter),
+            report_filter.top
+        )
+    return await project_crud.get_projects_by_completion_rate(
+        session, report_filter=report_filter
+    )
+
+
+def high_water_mark(closed_projects: list) -> Optional[int]:
+    """Id последней записи projectcompletion из выборки."""
+
+    return max(
+        (project['completion_id'] for project in closed_projects),
+        default=None
+    )
+
+
+async def make_incremental_report(
+        session: AsyncSession,
+        wrapper_services: Aiogoogle
+) -> str:
+    """
+    Дописать в отчёт только проекты, закрытые после прошлой выгрузки.
+
+    Закрытые проекты не меняются, поэтому достаточно помнить
+    id последней выгруженной записи projectcompletion.
+    Дата закрытия для отметки не годится: она берётся
+    до фиксации транзакции, и проект, закрытый раньше,
+    но зафиксированный позже выгрузки, оказался бы до отметки.
+    Записи в SQLite идут по одной, поэтому id записи
+    выдаётся в порядке фиксации.
+    Отметка сдвигается до записи в таблицу и откатывается,
+    если запись не удалась.
+    """
+
+    while True:
+        spreadsheet = await report_spreadsheet_crud.get_incremental(session)
+        if spreadsheet is None:
+            closed_projects = asyncio.ensure_future(
+                project_crud.get_projects_by_completion_rate(session)
+            )
+            spreadsheet_id, spreadsheet_url = await spreadsheets_report(
+                closed_projects, wrapper_services, sort_key=True
+            )
+            await report_spreadsheet_crud.register(
+                spreadsheet_id, session, incremental=True,
+                watermark=high_water_mark(closed_projects.result())
+            )
+            return spreadsheet_url
+
+        spreadsheet_url = SPREADSHEET_URL + spreadsheet.spreadsheet_id
+        watermark = spreadsheet.last_completion_id
+        new_projects = await project_crud.get_projects_by_completion_rate(
+            session, completed_after=watermark
+        )
+        if not new_projects:
+            return spreadsheet_url
+        new_watermark = high_water_mark(new_projects)
+        if not await report_spreadsheet_crud.move_watermark(
+                spreadsheet.id, watermark, new_watermark, session
+        ):
+            continue
+        try:
+            await spreadsheets_append_sorted(
+                spreadsheet.spreadsheet_id, new_projects, wrapper_services
+            )
+        except Exception:
+            await report_spreadsheet_crud.move_watermark(
+                spreadsheet.id, new_watermark, watermark, session
+            )
+            raise
+        return spreadsheet_url
+
+
+async def make_report(
+        session: AsyncSession,
+        wrapper_services: Aiogoogle,
+        report_filter: Optional[ReportFilter] = None,
+        read_session: Optional[AsyncSession] = None
+) -> str:
+    """
+    Сформировать отчёт о закрытых проектах и вернуть ссылку на него.
+
+    В режиме повторного использования отчёт дописывается
+    новым листом в таблицу из реестра; новая таблица создаётся,
+    только если реестр пуст. Проекты для отчёта читаются
+    через `read_session` (реплику), если она передана;
+    инкрементальный отчёт всегда читает с основной БД,
+    так как сверяет водяной знак, записанный в ней.
+    """
+
+    if settings.google_incremental_report:
+        return await make_incremental_report(session, wrapper_services)
+    if read_session is None:
+        read_session = session
+    if settings.google_reuse_spreadsheet:
+        reserved = await report_spreadsheet_crud.reserve_sheet(session)
+        if reserved is not None:
+            spreadsheet_id, sheet_id = reserved
+            return await spreadsheets_add_sheet(
+                spreadsheet_id, sheet_id,
+                await get_closed_projects(read_session, report_filter),
+                wrapper_services
+            )
+
+    spreadsheet_id, spreadsheet_url = await spreadsheets_report(
+        get_closed_projects(read_session, report_filter),
+        wrapper_services
+    )
+    if settings.google_reuse_spreadsheet:
+        await report_spreadsheet_crud.register(spreadsheet_id, session)
+    return spreadsheet_url
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, replica_router
+from app.core.google_client import get_service
+from app.crud.report_job import report_job_crud
+from app.schemas.filters import ReportFilter
+from app.schemas.report import ReportJobStatus
+from app.services.report import make_report
+
+logger = logging.getLogger(__name__)
+
+
+class ReportJobs:
+    """
+    Фоновое формирование отчётов в Google Sheets.
+
+    Эндпоинт создаёт задание и сразу возвращает его id,
+    а отчёт строится в отдельной задаче. Одновременно выполняется
+    не больше REPORT_JOBS_LIMIT отчётов, остальные ждут очереди,
+    не занимая соединений с БД и Google. Проекты для отчёта
+    читаются через `read_session_factory`, по умолчанию - с реплики.
+
+    Состояние заданий хранится в БД, а сами задачи - только
+    в памяти процесса: задания, прерванные перезапуском,
+    при следующем запуске помечаются ошибкой (`recover`).
+    """
+
+    def __init__(
+            self,
+            session_factory=AsyncSessionLocal,
+            service_factory=asynccontextmanager(get_service),
+            read_session_factory=replica_router
+    ):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+        self.service_factory = service_factory
+        self.tasks: set[asyncio.Task] = set()
+        self.limit: Optional[asyncio.Semaphore] = None
+
+    def submit(
+            self,
+            job_id: int,
+            report_filter: Optional[ReportFilter] = None
+    ) -> asyncio.Task:
+        """Запустить формирование отчёта для задания."""
+
+        if self.limit is None:
+            self.limit = asyncio.Semaphore(settings.report_jobs_limit)
+        task = asyncio.create_task(self.run(job_id, report_filter))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def run(
+            self,
+            job_id: int,
+            report_filter: Optional[ReportFilter] = None
+    ) -> None:
+        """Сформировать отчёт и записать результат в задание."""
+
+        async with self.limit, self.session_factory() as session:
+            await report_job_crud.set_status(
+                job_id, ReportJobStatus.running, session
+            )
+            try:
+                async with self.read_session_factory() as read_session, \
+                        self.service_factory() as wrapper_services:
+                    spreadsheet_url = await make_report(
+                        session, wrapper_services, report_filter,
+                        read_session=read_session
+                    )
+            except Exception as error:
+                logger.exception('Ошибка формирования отчёта %s', job_id)
+                await session.rollback()
+                await report_job_crud.set_status(
+                    job_id, ReportJobStatus.failed, session,
+                    error=str(error)
+                )
+                return
+            await report_job_crud.set_status(
+                job_id, ReportJobStatus.done, session,
+                spreadsheet_url=spreadsheet_url
+            )
+
+    async def recover(self) -> None:
+        """Завершить ошибкой задания, прерванные перезапуском."""
+
+        async with self.session_factory() as session:
+            interrupted = await report_job_crud.fail_unfinished(
+                session, 'Формирование прервано перезапуском сервиса.'
+            )
+        if interrupted:
+            logger.warning('Прервано заданий на отчёт: %s', interrupted)
+
+    async def stop(self) -> None:
+        """Дождаться отчётов, которые уже формируются."""
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.limit = None
+
+
+report_jobs = ReportJobs()
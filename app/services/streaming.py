@@ -0,0 +1,102 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Type
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+from app.schemas.filters import StreamFormat
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MEDIA_TYPE = 'application/json'
+STREAM_MEDIA_TYPES = {
+    StreamFormat.ndjson: 'application/x-ndjson',
+    StreamFormat.json: JSON_MEDIA_TYPE,
+}
+
+
+def encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Объект типа {type(value)} не сериализуется в JSON')
+
+
+def dumps(data) -> bytes:
+    """Закодировать в JSON быстрым кодировщиком, если он установлен."""
+
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, default=encode_default, separators=(',', ':')
+    ).encode()
+
+
+def schema_columns(schema: Type[BaseModel]) -> list[str]:
+    """Колонки, которые нужно выбрать для ответа по схеме."""
+
+    return list(schema.__fields__)
+
+
+def row_to_dict(row: Row, exclude_none: bool = False) -> dict:
+    """Собрать словарь ответа напрямую из строки выборки."""
+
+    data = row._asdict()
+    if exclude_none:
+        return {key: value for key, value in data.items()
+                if value is not None}
+    return data
+
+
+def rows_response(rows: Iterable[Row], exclude_none: bool = False) -> Response:
+    """
+    Отдать список строк без валидации через Pydantic.
+
+    Строки приходят из БД и уже соответствуют схеме ответа.
+    """
+
+    return Response(
+        dumps([row_to_dict(row, exclude_none) for row in rows]),
+        media_type=JSON_MEDIA_TYPE,
+    )
+
+
+async def encode_rows(
+        rows: AsyncIterator[Row],
+        stream_format: StreamFormat,
+        exclude_none: bool = False
+) -> AsyncIterator[bytes]:
+    """Кодировать строки по одной в NDJSON или JSON-массив."""
+
+    if stream_format == StreamFormat.ndjson:
+        async for row in rows:
+            yield dumps(row_to_dict(row, exclude_none)) + b'\n'
+        return
+
+    separator = b'['
+    async for row in rows:
+        yield separator + dumps(row_to_dict(row, exclude_none))
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+def stream_response(
+        rows: AsyncIterator[Row],
+        stream_format: StreamFormat,
+        exclude_none: bool = False
+) -> StreamingResponse:
+    """
+    Отдать список строк потоком.
+
+    Строки читаются из курсора и кодируются по мере отправки,
+    поэтому память не растёт с размером таблицы.
+    """
+
+    return StreamingResponse(
+        encode_rows(rows, stream_format, exclude_none),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+    )
@@ -0,0 +1,88 @@
+"""
+Скорость PATCH проектов с длинным описанием:
+перебор полей через jsonable_encoder против колонок маппера.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.crud_update
+
+Прежний путь кодировал весь объект (включая описание и даты),
+чтобы получить список полей. Текущий `CRUDBase.update` берёт
+имена колонок из маппера один раз на модель и меняет
+только отличающиеся поля.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.crud.charity_project import project_crud
+from app.models import CharityProject
+from app.schemas.charity_project import CharityProjectUpdate
+
+ROWS = 200
+DESCRIPTION = 'Описание проекта ' * 10_000
+
+
+async def encoder_update(db_obj, obj_in, session) -> None:
+    obj_data = jsonable_encoder(db_obj)
+    update_data = obj_in.dict(exclude_unset=True)
+    for field in obj_data:
+        if field in update_data:
+            setattr(db_obj, field, update_data[field])
+    session.add(db_obj)
+    await session.commit()
+
+
+async def mapper_update(db_obj, obj_in, session) -> None:
+    await project_crud.update(db_obj=db_obj, obj_in=obj_in, session=session)
+
+
+async def measure(update) -> float:
+    engine = create_async_engine('sqlite+aiosqlite://')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(CharityProject), [
+            {
+                'name': f'project {number}',
+                'description': DESCRIPTION,
+                'full_amount': 1000,
+                'invested_amount': 0,
+                'fully_invested': False,
+                'create_date': datetime.now(),
+                'version': 1,
+            }
+            for number in range(ROWS)
+        ])
+    session_factory = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        projects = (
+            await session.execute(select(CharityProject))
+        ).scalars().all()
+        started = time.perf_counter()
+        for project in projects:
+            await update(
+                project, CharityProjectUpdate(full_amount=2000), session
+            )
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return ROWS / elapsed
+
+
+async def main() -> None:
+    for name, update in (
+        ('jsonable_encoder', encoder_update),
+        ('колонки маппера', mapper_update),
+    ):
+        print(f'{name:>16}: {await measure(update):8.0f} обновлений/с')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Пропускная способность БД под параллельной нагрузкой:
+движок по умолчанию против настроенного пула и прагм SQLite.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.db_pool
+
+По умолчанию файловая SQLite открывает соединение на каждую сессию
+и работает в режиме журнала DELETE; настроенный движок
+(`app.core.db.create_engine`) держит пул соединений и включает
+WAL, synchronous=NORMAL, busy_timeout и mmap_size.
+"""
+import asyncio
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine as create_sync_engine
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.core.db import create_engine
+from app.models import Donation
+
+WORKERS = 20
+TRANSACTIONS = 50
+
+
+async def worker(session_factory, errors: list) -> None:
+    for _ in range(TRANSACTIONS):
+        async with session_factory() as session:
+            try:
+                await session.execute(insert(Donation).values(
+                    full_amount=100,
+                    invested_amount=0,
+                    fully_invested=False,
+                    create_date=datetime.now(),
+                    version=1,
+                ))
+                await session.scalar(
+                    select(func.count()).select_from(Donation).where(
+                        Donation.fully_invested.is_(False)
+                    )
+                )
+                await session.commit()
+            except OperationalError as error:
+                errors.append(error)
+                await session.rollback()
+
+
+async def measure(engine) -> tuple[float, int]:
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    errors = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(worker(session_factory, errors) for _ in range(WORKERS))
+    )
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return WORKERS * TRANSACTIONS / elapsed, len(errors)
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for number, (name, make_engine) in enumerate((
+            ('по умолчанию', create_async_engine),
+            ('пул + прагмы', create_engine),
+        )):
+            path = Path(directory) / f'bench_{number}.db'
+            Base.metadata.create_all(create_sync_engine(f'sqlite:///{path}'))
+            throughput, errors = await measure(
+                make_engine(f'sqlite+aiosqlite:///{path}')
+            )
+            print(
+                f'{name:>14}: {throughput:8.0f} транзакций/с, '
+                f'ошибок блокировки: {errors}'
+            )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Скорость сериализации списка проектов: ORM + Pydantic против строк.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.list_serialization
+
+Текущий путь: ORM-объекты -> CharityProjectDB.from_orm -> JSON.
+Быстрый путь: выборка нужных колонок -> словари -> dumps.
+dumps кодирует через orjson, а без него - стандартным json;
+какой кодировщик использован, печатается перед результатами.
+"""
+import json
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.base import Base
+from app.models import CharityProject
+from app.schemas.charity_project import CharityProjectDB
+from app.services import streaming
+from app.services.streaming import dumps, row_to_dict, schema_columns
+
+ROWS = 50_000
+
+
+def fill(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(CharityProject.__table__.insert(), [
+            {
+                'name': f'project {number}',
+                'description': 'Описание проекта ' * 10,
+                'full_amount': 1000,
+                'invested_amount': number % 1000,
+                'fully_invested': False,
+                'create_date': datetime.now(),
+                'version': 1,
+            }
+            for number in range(ROWS)
+        ])
+
+
+def orm_path(engine) -> bytes:
+    with Session(engine) as session:
+        projects = session.execute(select(CharityProject)).scalars().all()
+        data = [
+            jsonable_encoder(
+                CharityProjectDB.from_orm(project), exclude_none=True
+            )
+            for project in projects
+        ]
+    return json.dumps(data).encode()
+
+
+def rows_path(engine) -> bytes:
+    columns = schema_columns(CharityProjectDB)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(*(getattr(CharityProject, name) for name in columns))
+        ).all()
+    return dumps([row_to_dict(row, exclude_none=True) for row in rows])
+
+
+def main() -> None:
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    fill(engine)
+    encoder = 'orjson' if streaming.orjson is not None else 'json'
+    print(f'JSON encoder: {encoder}')
+    for name, path in (('orm + pydantic', orm_path), ('rows', rows_path)):
+        started = time.perf_counter()
+        path(engine)
+        elapsed = time.perf_counter() - started
+        print(f'{name:>15}: {ROWS / elapsed:>10.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Время выборки открытых пожертвований при растущей закрытой истории.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.open_items_query
+
+Для каждого объёма закрытых пожертвований замеряется первая страница
+FIFO-выборки с частичным индексом и без него.
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, text
+
+from app.constants import INVEST_BATCH_SIZE
+from app.core.base import Base
+from app.models import Donation
+
+CLOSED_ROWS = (10_000, 100_000, 1_000_000)
+OPEN_ROWS = 1_000
+REPEATS = 20
+
+
+def fill(engine, closed_rows: int) -> None:
+    start = datetime(2010, 1, 1)
+    rows = [
+        {
+            'full_amount': 100,
+            'invested_amount': 100 if number < closed_rows else 0,
+            'fully_invested': number < closed_rows,
+            'create_date': start + timedelta(seconds=number),
+            'version': 1,
+        }
+        for number in range(closed_rows + OPEN_ROWS)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Donation.__table__.insert(), rows)
+
+
+def measure(engine) -> float:
+    query = select(Donation).where(
+        Donation.fully_invested.is_(False)
+    ).order_by(
+        Donation.create_date, Donation.id
+    ).limit(INVEST_BATCH_SIZE)
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            conn.execute(query).all()
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main() -> None:
+    print(f'{"closed":>10} {"with index, ms":>16} {"without, ms":>12}')
+    for closed_rows in CLOSED_ROWS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(
+                f'sqlite:///{os.path.join(tmp_dir, "bench.db")}'
+            )
+            Base.metadata.create_all(engine)
+            fill(engine, closed_rows)
+            with_index = measure(engine)
+            with engine.begin() as conn:
+                conn.execute(text('DROP INDEX ix_donation_open_create_date'))
+            without_index = measure(engine)
+            engine.dispose()
+        print(f'{closed_rows:>10} {with_index:>16.3f} {without_index:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -91,3 +91,36 @@ def another_donation(freezer, mixer):
         full_amount=2000,
         create_date=datetime.now(),
     )
+
+
+@pytest.fixture
+def make_project(mixer):
+    def make(**fields):
+        return mixer.blend(
+            'app.models.charity_project.CharityProject',
+            **{
+                'description': 'Описание',
+                'full_amount': 100,
+                'invested_amount': 0,
+                'fully_invested': False,
+                'close_date': None,
+                'create_date': datetime.now(),
+                **fields,
+            }
+        )
+    return make
+
+
+
+@pytest.fixture
+def make_closed_project(make_project):
+    def make(name, create_date, close_date, **fields):
+        return make_project(
+            name=name,
+            invested_amount=100,
+            fully_invested=True,
+            create_date=create_date,
+            close_date=close_date,
+            **fields,
+        )
+    return make
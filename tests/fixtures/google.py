@@ -0,0 +1,160 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.excs import HTTPError
+from aiohttp import web
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.core.google_client import SCOPES, SharedAiogoogle
+from app.services.google_discovery import discovery_cache
+
+DISCOVERY_DIR = Path(__file__).resolve().parent / 'discovery'
+
+
+class FakeAiogoogle:
+    """
+    Подмена Aiogoogle: запоминает запросы и не ходит в сеть.
+
+    Листы таблицы отслеживаются по addSheet и deleteSheet;
+    как и Google, batchUpdate с удалением несуществующего листа
+    или с добавлением при `fail_add_sheet` отклоняется целиком.
+    """
+
+    def __init__(self, delay: float = 0):
+        self.requests = []
+        self.discovered = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sheet_ids = {0}
+        self.fail_add_sheet = False
+
+    def apply(self, request) -> dict:
+        if request.method == 'GET':
+            return {'sheets': [
+                {'properties': {'sheetId': sheet_id}}
+                for sheet_id in sorted(self.sheet_ids)
+            ]}
+        sheet_ids = set(self.sheet_ids)
+        for item in (request.json or {}).get('requests', []):
+            if 'addSheet' in item:
+                if self.fail_add_sheet:
+                    raise HTTPError('Ошибка Google API', request, None)
+                sheet_ids.add(item['addSheet']['properties']['sheetId'])
+            if 'deleteSheet' in item:
+                sheet_id = item['deleteSheet']['sheetId']
+                if sheet_id not in sheet_ids:
+                    raise HTTPError(f'Нет листа {sheet_id}', request, None)
+                sheet_ids.remove(sheet_id)
+        self.sheet_ids = sheet_ids
+        return {'spreadsheetId': 'fake-spreadsheet-id', 'id': 'permission'}
+
+    async def discover(self, api_name, api_version):
+        self.discovered.append((api_name, api_version))
+        raise AssertionError(
+            f'Discovery-документ {api_name} {api_version} '
+            'должен браться из кэша.'
+        )
+
+    async def as_service_account(self, *requests):
+        self.requests.extend(requests)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        responses = [self.apply(request) for request in requests]
+        return responses[0] if len(responses) == 1 else responses
+
+
+@pytest.fixture
+def seeded_discovery():
+    discovery_cache.clear()
+    for path in DISCOVERY_DIR.glob('*.json'):
+        discovery_cache.seed(path)
+    yield discovery_cache
+    discovery_cache.clear()
+
+
+@pytest.fixture
+def fake_google(seeded_discovery):
+    return FakeAiogoogle()
+
+
+class FakeGoogleServer:
+    """Локальный сервер с токен-эндпоинтом и созданием таблиц."""
+
+    def __init__(self):
+        self.token_requests = 0
+        self.connections = set()
+        self.spreadsheets = 0
+        self.app = web.Application()
+        self.app.router.add_post('/token', self.token)
+        self.app.router.add_post('/v4/spreadsheets', self.create)
+
+    def track(self, request):
+        self.connections.add(id(request.transport))
+
+    async def token(self, request):
+        self.track(request)
+        self.token_requests += 1
+        return web.json_response({
+            'access_token': 'fake-token',
+            'expires_in': 3600,
+            'token_type': 'Bearer'
+        })
+
+    async def create(self, request):
+        self.track(request)
+        assert request.headers['Authorization'] == 'Bearer fake-token'
+        self.spreadsheets += 1
+        return web.json_response(
+            {'spreadsheetId': f'spreadsheet-{self.spreadsheets}'}
+        )
+
+
+def service_account_creds(token_uri):
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048
+    ).private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    return ServiceAccountCreds(
+        scopes=SCOPES,
+        type='service_account',
+        private_key_id='fake-key',
+        private_key=private_key,
+        client_email='qrkot@example.iam.gserviceaccount.com',
+        client_id='1',
+        token_uri=token_uri
+    )
+
+
+@pytest.fixture
+async def fake_google_server(seeded_discovery):
+    server = FakeGoogleServer()
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    server.url = f'http://127.0.0.1:{port}/'
+    document = json.loads((DISCOVERY_DIR / 'sheets.v4.json').read_text())
+    document['rootUrl'] = document['baseUrl'] = server.url
+    seeded_discovery.put(document)
+    yield server
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def shared_google(fake_google_server):
+    client = SharedAiogoogle(
+        service_account_creds(fake_google_server.url + 'token'), pool_size=1
+    )
+    yield client
+    await client.close()
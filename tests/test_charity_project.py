@@ -728,3 +728,41 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+@pytest.mark.usefixtures(
+    'closed_charity_project', 'donation', 'another_donation'
+)
+def test_create_projects_bulk(superuser_client):
+    response = superuser_client.post(PROJECTS_URL + 'bulk', json=[
+        {'name': 'Первый', 'description': 'Описание', 'full_amount': 1500},
+        {'name': 'chimichangas4life', 'description': 'Занято',
+         'full_amount': 10},
+        {'name': 'Второй', 'description': 'Описание', 'full_amount': 1000},
+        {'name': 'Первый', 'description': 'Повтор', 'full_amount': 10},
+        {'name': '', 'description': 'Пустое имя', 'full_amount': 10},
+    ])
+    assert response.status_code == 200, (
+        'POST-запрос суперпользователя к `/charity_project/bulk` '
+        'должен возвращать статус 200.'
+    )
+    results = response.json()
+    created = {
+        item['index']: item['created'] for item in results
+        if 'created' in item
+    }
+    assert sorted(created) == [0, 2], (
+        'Проекты с занятыми, повторяющимися или пустыми именами '
+        'должны отклоняться.'
+    )
+    assert all('errors' in results[index] for index in (1, 3, 4))
+    assert results[1]['errors'][0]['msg'] == (
+        'Проект с таким именем уже существует!'
+    )
+    assert [
+        (project['invested_amount'], project['fully_invested'])
+        for project in created.values()
+    ] == [(1500, True), (600, False)], (
+        'Открытые пожертвования должны распределяться по новым проектам '
+        'пакета в порядке их создания.'
+    )
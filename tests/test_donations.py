@@ -1,3 +1,4 @@
+import json
 import time
 from datetime import datetime
 
@@ -221,3 +222,130 @@ def test_create_donation_check_create_date(user_client):
         'Убедитесь, что при неодновременном создании двух пожертвований '
         'у них отличаются значения в поле `create_date`.'
     )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_get_donations_keyset_page(superuser_client):
+    first_page = superuser_client.get(DONATIONS_URL, params={'limit': 1})
+    assert first_page.status_code == 200
+    first_page = first_page.json()
+    assert len(first_page) == 1, (
+        'Параметр `limit` должен ограничивать размер страницы.'
+    )
+    second_page = superuser_client.get(
+        DONATIONS_URL, params={'limit': 1, 'after': first_page[0]['id']}
+    ).json()
+    assert [d['comment'] for d in first_page + second_page] == [
+        'To you for chimichangas', 'From admin'
+    ], 'Параметр `after` должен возвращать следующую страницу по id.'
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_get_donations_filters(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'user_id': 1})
+    assert [d['user_id'] for d in response.json()] == [1], (
+        'Фильтр `user_id` должен оставлять пожертвования пользователя.'
+    )
+    response = superuser_client.get(
+        DONATIONS_URL, params={'create_date_from': '2012-01-01T00:00:00'}
+    )
+    assert [d['comment'] for d in response.json()] == ['From admin'], (
+        'Фильтр `create_date_from` должен отсекать ранние пожертвования.'
+    )
+
+
+def test_get_donations_invalid_limit(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'limit': 0})
+    assert response.status_code == 422, (
+        'Размер страницы должен быть положительным.'
+    )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_get_donations_stream_ndjson(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'stream': 'ndjson'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == superuser_client.get(DONATIONS_URL).json(), (
+        'Потоковый NDJSON-ответ должен содержать те же данные, '
+        'что и обычный список.'
+    )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_get_my_donations_stream_json(user_client):
+    response = user_client.get(MY_DONATIONS_URL, params={'stream': 'json'})
+    assert response.status_code == 200
+    assert response.json() == user_client.get(MY_DONATIONS_URL).json(), (
+        'Потоковый JSON-массив должен совпадать с обычным ответом.'
+    )
+
+
+def test_get_donations_stream_empty(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'stream': 'json'})
+    assert response.json() == [], (
+        'Пустой потоковый JSON-массив должен быть корректным JSON.'
+    )
+
+
+BULK_DONATIONS = [
+    {'full_amount': 100},
+    {'full_amount': -5},
+    {'full_amount': 200, 'comment': 'Для импорта'},
+]
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+async def test_create_donations_bulk(user_client, charity_project, ndjson):
+    from sqlalchemy import select
+
+    from conftest import TestingSessionLocal
+
+    from app.models import CharityProject
+
+    if ndjson:
+        response = user_client.post(
+            DONATIONS_URL + 'bulk',
+            data='\n'.join(json.dumps(item) for item in BULK_DONATIONS),
+            headers={'Content-Type': 'application/x-ndjson'},
+        )
+    else:
+        response = user_client.post(
+            DONATIONS_URL + 'bulk', json=BULK_DONATIONS
+        )
+    assert response.status_code == 200, (
+        'POST-запрос к `/donation/bulk` должен возвращать статус 200.'
+    )
+    results = response.json()
+    assert [item['index'] for item in results] == [0, 1, 2]
+    assert [
+        item['created']['full_amount'] for item in results
+        if 'created' in item
+    ] == [100, 200], (
+        'Для корректных элементов пакета должны возвращаться '
+        'созданные пожертвования.'
+    )
+    assert results[1]['errors'][0]['loc'] == ['full_amount'], (
+        'Для некорректного элемента пакета должны возвращаться ошибки.'
+    )
+
+    async with TestingSessionLocal() as session:
+        invested_amount = (await session.execute(
+            select(CharityProject.invested_amount)
+            .where(CharityProject.id == charity_project.id)
+        )).scalar()
+    assert invested_amount == 300, (
+        'Пакет пожертвований должен распределяться по открытым проектам.'
+    )
+
+
+@pytest.mark.parametrize('content', ['{"full_amount": 100}', 'not json'])
+def test_create_donations_bulk_invalid_payload(user_client, content):
+    response = user_client.post(
+        DONATIONS_URL + 'bulk', data=content,
+        headers={'Content-Type': 'application/json'},
+    )
+    assert response.status_code == 400, (
+        'Тело пакетного запроса должно быть JSON-массивом или NDJSON.'
+    )
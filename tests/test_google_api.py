@@ -0,0 +1,412 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from aiogoogle.excs import HTTPError
+from conftest import TestingSessionLocal
+from fixtures.google import FakeAiogoogle
+
+from app.services.google_api import (
+    difference_days, set_user_permissions, spreadsheets_add_sheet,
+    spreadsheets_create, spreadsheets_report, spreadsheets_update_value
+)
+from app.core.config import settings
+from app.services import google_api
+from app.services.google_discovery import DiscoveryCache
+from app.schemas.filters import ReportFilter
+from app.schemas.report import ReportJobStatus
+from app.crud.report_job import report_job_crud
+from app.crud.report_spreadsheet import report_spreadsheet_crud
+from app.services.report import get_closed_projects, make_report
+from app.services.report_jobs import report_jobs
+
+
+async def test_report_uses_cached_discovery(fake_google):
+    spreadsheet_id, spreadsheet_url = await spreadsheets_create(fake_google)
+    await set_user_permissions(spreadsheet_id, fake_google)
+    await spreadsheets_update_value(spreadsheet_id, [], fake_google)
+
+    assert fake_google.discovered == [], (
+        'Discovery-документы должны браться из кэша, а не из сети.'
+    )
+    assert spreadsheet_url.endswith(spreadsheet_id)
+    assert [request.method for request in fake_google.requests] == [
+        'POST', 'POST', 'POST'
+    ], 'Отчёт должен отправлять только запросы создания, прав и записи.'
+
+
+async def test_discovery_cache_persists_to_disk(tmp_path, seeded_discovery):
+    document = seeded_discovery.get('sheets', 'v4').discovery_document
+    DiscoveryCache(ttl=60, cache_dir=str(tmp_path)).write_file(document)
+
+    cache = DiscoveryCache(ttl=60, cache_dir=str(tmp_path))
+    assert cache.get('sheets', 'v4') is not None, (
+        'Кэш должен подхватывать документ, сохранённый на диск.'
+    )
+    assert DiscoveryCache(ttl=0, cache_dir=str(tmp_path)).get(
+        'sheets', 'v4'
+    ) is None, 'Устаревший документ на диске не должен использоваться.'
+
+
+async def test_shared_client_reuses_token_and_connection(
+        fake_google_server, shared_google
+):
+    await spreadsheets_create(shared_google)
+    await asyncio.gather(
+        *(spreadsheets_create(shared_google) for _ in range(4))
+    )
+
+    assert fake_google_server.spreadsheets == 5
+    assert fake_google_server.token_requests == 1, (
+        'Токен сервисного аккаунта должен запрашиваться один раз.'
+    )
+    assert len(fake_google_server.connections) == 1, (
+        'Запросы должны переиспользовать соединение из пула.'
+    )
+
+
+async def test_report_runs_independent_calls_concurrently(seeded_discovery):
+    fake_google = FakeAiogoogle(delay=0.01)
+    requests_during_query = []
+
+    async def closed_projects():
+        await asyncio.sleep(0.01)
+        requests_during_query.append(len(fake_google.requests))
+        return []
+
+    spreadsheet_id, spreadsheet_url = await spreadsheets_report(
+        closed_projects(), fake_google
+    )
+
+    assert spreadsheet_url.endswith(spreadsheet_id)
+    assert requests_during_query == [1], (
+        'Документ должен создаваться параллельно с запросом к БД.'
+    )
+    assert fake_google.max_in_flight == 2, (
+        'Выдача прав и запись данных должны выполняться параллельно.'
+    )
+
+
+async def test_reused_spreadsheet_costs_one_write(monkeypatch, fake_google):
+    monkeypatch.setattr(settings, 'google_reuse_spreadsheet', True)
+    monkeypatch.setattr(settings, 'google_report_sheets_limit', 2)
+
+    async with TestingSessionLocal() as session:
+        first_url = await make_report(session, fake_google)
+        assert len(fake_google.requests) == 3
+        second_url = await make_report(session, fake_google)
+        third_url = await make_report(session, fake_google)
+
+    assert second_url.startswith(first_url)
+    assert second_url.endswith('#gid=1') and third_url.endswith('#gid=2')
+    reused = [
+        request for request in fake_google.requests[3:]
+        if request.method != 'GET'
+    ]
+    assert len(reused) == 2, (
+        'Повторный отчёт должен стоить одну запись в API.'
+    )
+    assert len(fake_google.requests[3:]) == 3, (
+        'Список листов должен запрашиваться, только когда '
+        'достигнут лимит листов.'
+    )
+    second, third = (request.json['requests'] for request in reused)
+    assert second[0]['addSheet']['properties']['sheetId'] == 1
+    assert 'deleteSheet' not in second[-1]
+    assert third[-1] == {'deleteSheet': {'sheetId': 0}}, (
+        'Листы сверх лимита должны удаляться в том же batchUpdate.'
+    )
+    assert fake_google.sheet_ids == {1, 2}
+
+
+async def test_failed_added_sheet_leaves_no_dangling_delete(
+        monkeypatch, fake_google
+):
+    monkeypatch.setattr(settings, 'google_reuse_spreadsheet', True)
+    monkeypatch.setattr(settings, 'google_report_sheets_limit', 2)
+
+    async with TestingSessionLocal() as session:
+        await make_report(session, fake_google)
+        fake_google.fail_add_sheet = True
+        with pytest.raises(HTTPError):
+            await make_report(session, fake_google)
+        fake_google.fail_add_sheet = False
+        await make_report(session, fake_google)
+        url = await make_report(session, fake_google)
+
+    assert url.endswith('#gid=3')
+    assert fake_google.sheet_ids == {2, 3}, (
+        'Лист, который не удалось добавить, не должен удаляться позже: '
+        'удаляются только листы, реально существующие в таблице.'
+    )
+
+
+async def test_reuse_skips_incremental_spreadsheet():
+    async with TestingSessionLocal() as session:
+        await report_spreadsheet_crud.register(
+            'incremental-id', session, incremental=True
+        )
+        assert await report_spreadsheet_crud.reserve_sheet(session) is None, (
+            'Таблица инкрементального отчёта не должна получать новые листы.'
+        )
+        await report_spreadsheet_crud.register('reused-id', session)
+        await report_spreadsheet_crud.register(
+            'newer-incremental-id', session, incremental=True
+        )
+        assert await report_spreadsheet_crud.reserve_sheet(session) == (
+            'reused-id', 1
+        ), 'Лист должен добавляться в таблицу режима повторного использования.'
+
+
+def closed_projects(count):
+    return [
+        {'name': f'Проект {number}', 'duration_seconds': 129600,
+         'description': 'Описание'}
+        for number in range(count)
+    ]
+
+
+def written_rows(requests):
+    rows = []
+    for request in requests:
+        for value_range in request.json['data']:
+            start = int(value_range['range'].split('!')[-1][1:].split(':')[0])
+            assert start == len(rows) + 1, 'Диапазоны должны идти подряд.'
+            assert len(value_range['values']) <= google_api.REPORT_CHUNK_ROWS
+            rows.extend(value_range['values'])
+        payload = sum(
+            len(json.dumps(row))
+            for value_range in request.json['data']
+            for row in value_range['values']
+        )
+        assert payload <= google_api.REPORT_PAYLOAD_LIMIT, (
+            'Тело запроса не должно превышать лимит.'
+        )
+    return rows
+
+
+async def test_large_report_is_written_in_batches(monkeypatch, fake_google):
+    monkeypatch.setattr(google_api, 'REPORT_CHUNK_ROWS', 50)
+    monkeypatch.setattr(google_api, 'REPORT_PAYLOAD_LIMIT', 10_000)
+
+    await spreadsheets_update_value('id', closed_projects(997), fake_google)
+
+    resize, *writes = fake_google.requests
+    properties = resize.json['requests'][0]['updateSheetProperties']
+    assert properties['properties']['gridProperties']['rowCount'] == 1000, (
+        'Сетка должна расширяться до фактического числа строк.'
+    )
+    assert 1 < len(writes) < 20
+    assert any(len(request.json['data']) > 1 for request in writes), (
+        'Один запрос должен записывать несколько диапазонов.'
+    )
+    rows = written_rows(writes)
+    assert len(rows) == 1000
+    assert rows[-1][0] == 'Проект 996'
+
+
+async def test_large_report_in_added_sheet(monkeypatch, fake_google):
+    monkeypatch.setattr(google_api, 'REPORT_CHUNK_ROWS', 50)
+    monkeypatch.setattr(google_api, 'REPORT_PAYLOAD_LIMIT', 10_000)
+
+    await spreadsheets_add_sheet('id', 3, closed_projects(497), fake_google)
+
+    add_sheet, *writes = fake_google.requests
+    add_sheet, update_cells = add_sheet.json['requests']
+    properties = add_sheet['addSheet']['properties']
+    assert properties['gridProperties']['rowCount'] == 500
+    first_rows = update_cells['updateCells']['rows']
+    assert all(
+        value_range['range'].startswith(f"'{properties['title']}'!")
+        for request in writes for value_range in request.json['data']
+    )
+    assert len(first_rows) + sum(
+        len(value_range['values'])
+        for request in writes for value_range in request.json['data']
+    ) == 500, 'Все строки отчёта должны быть записаны один раз.'
+
+
+async def test_incremental_report_appends_new_projects(
+        monkeypatch, make_closed_project, fake_google
+):
+    monkeypatch.setattr(settings, 'google_incremental_report', True)
+    make_closed_project(
+        'slow', datetime(2010, 10, 1), datetime(2010, 10, 6)
+    )
+    make_closed_project(
+        'fast', datetime(2010, 10, 1), datetime(2010, 10, 2)
+    )
+
+    async with TestingSessionLocal() as session:
+        first_url = await make_report(session, fake_google)
+        created = len(fake_google.requests)
+        assert await make_report(session, fake_google) == first_url
+        assert len(fake_google.requests) == created, (
+            'Без новых закрытых проектов отчёт не должен обращаться к API.'
+        )
+        make_closed_project(
+            'medium', datetime(2010, 10, 8), datetime(2010, 10, 11)
+        )
+        assert await make_report(session, fake_google) == first_url
+
+    appended, = fake_google.requests[created:]
+    requests = appended.json['requests']
+    rows = requests[0]['appendCells']['rows']
+    assert [
+        row['values'][0]['userEnteredValue']['stringValue'] for row in rows
+    ] == ['medium'], 'Дописываться должны только новые проекты.'
+    assert rows[0]['values'][3]['userEnteredValue']['numberValue'] == 3 * 86400
+    assert requests[-1]['sortRange']['sortSpecs'][0]['dimensionIndex'] == 3, (
+        'Отчёт должен сортироваться в таблице по скрытому столбцу.'
+    )
+
+
+async def test_incremental_report_appends_late_committed_project(
+        monkeypatch, make_closed_project, fake_google
+):
+    monkeypatch.setattr(settings, 'google_incremental_report', True)
+    make_closed_project(
+        'slow', datetime(2010, 10, 1), datetime(2010, 10, 6)
+    )
+
+    async with TestingSessionLocal() as session:
+        await make_report(session, fake_google)
+        created = len(fake_google.requests)
+        # Проект закрылся раньше уже выгруженного,
+        # но его транзакция зафиксирована после выгрузки.
+        make_closed_project(
+            'late', datetime(2010, 10, 1), datetime(2010, 10, 3)
+        )
+        await make_report(session, fake_google)
+
+    appended, = fake_google.requests[created:]
+    rows = appended.json['requests'][0]['appendCells']['rows']
+    assert [
+        row['values'][0]['userEnteredValue']['stringValue'] for row in rows
+    ] == ['late'], (
+        'Проект, зафиксированный после выгрузки, должен попасть в отчёт, '
+        'даже если закрылся раньше уже выгруженных.'
+    )
+
+
+def test_difference_days_formats_seconds():
+    assert difference_days(129600) == '1 day, 12:00:0.000000'
+    assert difference_days(2 * 86400 + 3725) == '2 days, 1:02:5.000000', (
+        'Длительность в секундах должна выводиться в прежнем формате.'
+    )
+
+
+@pytest.mark.parametrize('ranking', ['index', 'heap'])
+async def test_top_closed_projects_in_window(
+        monkeypatch, make_closed_project, ranking
+):
+    monkeypatch.setattr(settings, 'report_ranking', ranking)
+    for name, created, closed in [
+        ('early', 1, 2), ('slow', 3, 9), ('fast', 5, 6),
+        ('medium', 4, 7), ('late', 20, 21)
+    ]:
+        make_closed_project(
+            name, datetime(2010, 10, created), datetime(2010, 10, closed)
+        )
+
+    async with TestingSessionLocal() as session:
+        projects = await get_closed_projects(session, ReportFilter(
+            top=2,
+            closed_from=datetime(2010, 10, 5),
+            closed_to=datetime(2010, 10, 10)
+        ))
+
+    assert [project.name for project in projects] == ['fast', 'medium'], (
+        'Отчёт должен содержать top самых быстрых сборов '
+        'среди проектов, закрытых в указанном интервале.'
+    )
+
+
+@pytest.fixture
+def background_reports(monkeypatch, seeded_discovery):
+    fake_google = FakeAiogoogle(delay=0.01)
+
+    @asynccontextmanager
+    async def fake_service():
+        yield fake_google
+
+    monkeypatch.setattr(report_jobs, 'service_factory', fake_service)
+    monkeypatch.setattr(report_jobs, 'limit', None)
+    return fake_google
+
+
+def test_report_job_polling(superuser_client, background_reports):
+    response = superuser_client.post('/google/jobs', params={'top': 3})
+    assert response.status_code == 202, (
+        'Постановка отчёта в очередь должна сразу возвращать задание.'
+    )
+    job_url = f"/google/jobs/{response.json()['id']}"
+
+    for _ in range(100):
+        job = superuser_client.get(job_url).json()
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.01)
+    assert job['status'] == 'done', job
+    assert job['spreadsheet_url'].endswith('fake-spreadsheet-id')
+    assert job['finish_date'] is not None
+    assert superuser_client.get('/google/jobs/100500').status_code == 404
+
+
+async def test_report_jobs_are_limited(monkeypatch, background_reports):
+    monkeypatch.setattr(settings, 'report_jobs_limit', 1)
+    async with TestingSessionLocal() as session:
+        job_ids = [
+            (await report_job_crud.create(session)).id for _ in range(3)
+        ]
+
+    await asyncio.gather(*(report_jobs.submit(job_id) for job_id in job_ids))
+
+    assert background_reports.max_in_flight == 2, (
+        'При лимите в одно задание отчёты должны строиться по очереди.'
+    )
+    async with TestingSessionLocal() as session:
+        statuses = [
+            (await report_job_crud.get(job_id, session)).status
+            for job_id in job_ids
+        ]
+    assert statuses == ['done'] * 3
+
+
+async def test_failed_report_job(monkeypatch, background_reports):
+    async def broken(*requests):
+        raise RuntimeError('Google недоступен')
+
+    monkeypatch.setattr(background_reports, 'as_service_account', broken)
+    async with TestingSessionLocal() as session:
+        job = await report_job_crud.create(session)
+    await report_jobs.submit(job.id)
+
+    async with TestingSessionLocal() as session:
+        job = await report_job_crud.get(job.id, session)
+    assert job.status == 'failed' and 'Google недоступен' in job.error
+
+
+async def test_interrupted_report_jobs_fail_on_startup():
+    async with TestingSessionLocal() as session:
+        job_ids = [(await report_job_crud.create(session)).id for _ in '12']
+        await report_job_crud.set_status(
+            job_ids[0], ReportJobStatus.done, session
+        )
+
+    await report_jobs.recover()
+
+    async with TestingSessionLocal() as session:
+        done, interrupted = [
+            await report_job_crud.get(job_id, session) for job_id in job_ids
+        ]
+    assert done.status == ReportJobStatus.done.value
+    assert interrupted.status == ReportJobStatus.failed.value, (
+        'Задание, прерванное перезапуском, должно завершаться ошибкой, '
+        'а не оставаться в очереди навсегда.'
+    )
+    assert interrupted.error and interrupted.finish_date
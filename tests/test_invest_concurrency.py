@@ -0,0 +1,200 @@
+import asyncio
+
+import pytest
+from conftest import TEST_DB_URL, TestingSessionLocal
+from sqlalchemy import func, select
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.core.config import settings
+from app.crud import donation_crud, project_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate
+from app.services import invest_processing
+from app.services.invest_processing import (
+    create_bulk_with_invest_processing, create_with_invest_processing
+)
+
+DONATIONS_COUNT = 200
+DONATION_AMOUNT = 15
+PROJECTS_COUNT = 20
+PROJECT_AMOUNT = 100
+
+
+@pytest.fixture
+def open_projects(make_project):
+    return [
+        make_project(name=f'project {number}', full_amount=PROJECT_AMOUNT)
+        for number in range(PROJECTS_COUNT)
+    ]
+
+
+async def make_donation(user_id=None):
+    async with TestingSessionLocal() as session:
+        # Пользователь загружается той же сессией, как в fastapi-users,
+        # поэтому повтор после конфликта работает с откатанной сессией.
+        user = None if user_id is None else await session.get(User, user_id)
+        await create_with_invest_processing(
+            donation_crud,
+            DonationCreate(full_amount=DONATION_AMOUNT),
+            project_crud,
+            session,
+            user=user,
+        )
+
+
+async def check_concurrent_donations(monkeypatch, engine, user_id=None):
+    monkeypatch.setattr(settings, 'invest_engine', engine)
+    monkeypatch.setattr(settings, 'invest_retries', DONATIONS_COUNT)
+
+    await asyncio.gather(
+        *(make_donation(user_id) for _ in range(DONATIONS_COUNT))
+    )
+
+    async with TestingSessionLocal() as session:
+        donated = await session.scalar(
+            select(func.sum(Donation.invested_amount))
+        )
+        invested = await session.scalar(
+            select(func.sum(CharityProject.invested_amount))
+        )
+        overflow = await session.scalar(
+            select(func.count()).where(
+                CharityProject.invested_amount > CharityProject.full_amount
+            )
+        )
+        owners = set(await session.scalars(select(Donation.user_id)))
+        open_donations = await session.scalar(
+            select(func.count()).where(Donation.fully_invested.is_(False))
+        )
+        open_projects = await session.scalar(
+            select(func.count()).where(
+                CharityProject.fully_invested.is_(False)
+            )
+        )
+    expected = min(
+        DONATIONS_COUNT * DONATION_AMOUNT, PROJECTS_COUNT * PROJECT_AMOUNT
+    )
+    assert donated == invested == expected, (
+        'При параллельных пожертвованиях сумма, списанная с пожертвований, '
+        'должна совпадать с суммой, зачисленной в проекты.'
+    )
+    assert overflow == 0, (
+        'Параллельные пожертвования не должны переполнять проекты.'
+    )
+    assert not (open_donations and open_projects), (
+        'После параллельных пожертвований не должно оставаться '
+        'открытых пожертвований рядом с открытыми проектами.'
+    )
+    assert owners == {user_id}, (
+        'Повторённые после конфликта пожертвования должны сохранять '
+        'автора.'
+    )
+
+
+@pytest.fixture
+def db_user(mixer):
+    return mixer.blend(
+        'app.models.user.User',
+        email='donor@example.com',
+        hashed_password='hashed',
+        is_active=True,
+        is_superuser=False,
+        is_verified=True,
+    )
+
+
+@pytest.mark.parametrize('with_user', [False, True])
+@pytest.mark.parametrize('engine', ['orm', 'sql'])
+@pytest.mark.usefixtures('open_projects')
+async def test_concurrent_donations_conserve_totals(
+        monkeypatch, request, engine, with_user
+):
+    user_id = request.getfixturevalue('db_user').id if with_user else None
+    await check_concurrent_donations(monkeypatch, engine, user_id)
+
+
+@pytest.mark.postgres
+@pytest.mark.skipif(
+    TEST_DB_URL.get_backend_name() != 'postgresql',
+    reason='Нужен TEST_DATABASE_URL на PostgreSQL.'
+)
+@pytest.mark.parametrize('engine', ['orm', 'sql'])
+@pytest.mark.usefixtures('open_projects')
+async def test_concurrent_donations_lock_rows(
+        monkeypatch, db_user, engine
+):
+    async with TestingSessionLocal() as session:
+        assert project_crud.can_lock_rows(session), (
+            'На PostgreSQL открытые объекты должны выбираться '
+            'с FOR UPDATE.'
+        )
+    await check_concurrent_donations(monkeypatch, engine, db_user.id)
+
+
+@pytest.fixture
+def one_conflict(monkeypatch):
+    """Первая попытка распределения завершается конфликтом версий."""
+
+    run_invest_processing = invest_processing.run_invest_processing
+    calls = []
+
+    async def conflicting(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise StaleDataError('Конфликт версий')
+        await run_invest_processing(*args, **kwargs)
+
+    monkeypatch.setattr(
+        invest_processing, 'run_invest_processing', conflicting
+    )
+    return calls
+
+
+@pytest.mark.usefixtures('open_projects')
+async def test_retry_with_session_bound_user(db_user, one_conflict):
+    async with TestingSessionLocal() as session:
+        # Пользователь загружен той же сессией, как в fastapi-users.
+        user = await session.get(User, db_user.id)
+        donation = await create_with_invest_processing(
+            donation_crud,
+            DonationCreate(full_amount=DONATION_AMOUNT),
+            project_crud,
+            session,
+            user=user,
+        )
+        assert len(one_conflict) == 2, (
+            'После конфликта распределение должно повториться.'
+        )
+        assert donation.user_id == db_user.id
+        assert donation.invested_amount == DONATION_AMOUNT, (
+            'Повторная попытка должна создать и распределить пожертвование.'
+        )
+
+
+@pytest.mark.usefixtures('open_projects')
+async def test_bulk_retry_with_session_bound_user(monkeypatch, db_user):
+    settle_open_items = invest_processing.settle_open_items
+    calls = []
+
+    async def conflicting(session):
+        calls.append(session)
+        if len(calls) == 1:
+            raise StaleDataError('Конфликт версий')
+        return await settle_open_items(session)
+
+    monkeypatch.setattr(invest_processing, 'settle_open_items', conflicting)
+    async with TestingSessionLocal() as session:
+        user = await session.get(User, db_user.id)
+        donations = await create_bulk_with_invest_processing(
+            donation_crud,
+            [DonationCreate(full_amount=DONATION_AMOUNT)] * 2,
+            session,
+            user=user,
+        )
+        assert len(calls) == 2, (
+            'После конфликта пакетное распределение должно повториться.'
+        )
+        assert [
+            (donation.user_id, donation.invested_amount)
+            for donation in donations
+        ] == [(db_user.id, DONATION_AMOUNT)] * 2
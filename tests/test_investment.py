@@ -60,3 +60,392 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+async def test_iter_objects_for_invest_processing_pages():
+    from conftest import TestingSessionLocal
+
+    from app.crud import donation_crud
+
+    async with TestingSessionLocal() as session:
+        donations = [
+            obj async for obj in
+            donation_crud.iter_objects_for_invest_processing(
+                session, batch_size=1
+            )
+        ]
+    assert [obj.full_amount for obj in donations] == [100, 2000], (
+        'Постраничная выборка открытых пожертвований должна возвращать '
+        'все открытые объекты в порядке даты создания.'
+    )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_project_takes_only_needed_donations(superuser_client):
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'small',
+        'description': 'small project',
+        'full_amount': 50,
+    })
+    assert response.json()['fully_invested'], (
+        'Новый проект должен закрываться первым открытым пожертвованием.'
+    )
+    data_donation = superuser_client.get(DONATION_URL).json()
+    assert [d['invested_amount'] for d in data_donation] == [50, 0], (
+        'Следующие пожертвования не должны затрагиваться, '
+        'если средств первого хватило на проект.'
+    )
+
+
+@pytest.fixture
+def sql_invest_engine(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, 'invest_engine', 'sql')
+
+
+@pytest.mark.usefixtures('sql_invest_engine')
+def test_sql_engine_fully_invested_amount_for_two_projects(
+        user_client, charity_project, charity_project_nunchaku
+):
+    [user_client.post(
+        DONATION_URL, json={'full_amount': 500000}) for _ in range(2)]
+    assert charity_project.fully_invested, (
+        'SQL-движок распределения должен закрывать проект, '
+        'когда собрана полная сумма.'
+    )
+    assert charity_project.close_date is not None
+    assert charity_project_nunchaku.invested_amount == 0
+
+
+@pytest.mark.usefixtures(
+    'sql_invest_engine', 'donation', 'another_donation'
+)
+def test_sql_engine_splits_project_between_donations(superuser_client):
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'split',
+        'description': 'split project',
+        'full_amount': 150,
+    })
+    data = response.json()
+    assert data['fully_invested'] and data['invested_amount'] == 150, (
+        'SQL-движок должен закрывать проект из нескольких пожертвований.'
+    )
+    data_donation = superuser_client.get(DONATION_URL).json()
+    assert [
+        (d['invested_amount'], d['fully_invested']) for d in data_donation
+    ] == [(100, True), (50, False)], (
+        'SQL-движок должен распределять средства по принципу FIFO.'
+    )
+
+
+@pytest.fixture
+def deferred_invest(monkeypatch):
+    from conftest import TestingSessionLocal
+
+    from app.core.config import settings
+    from app.services.invest_queue import invest_queue
+
+    monkeypatch.setattr(settings, 'invest_deferred', True)
+    monkeypatch.setattr(invest_queue, 'session_factory', TestingSessionLocal)
+    yield invest_queue
+    invest_queue.take_pending()
+
+
+async def test_deferred_donations_coalesced(
+        user_client, charity_project, deferred_invest
+):
+    from conftest import TestingSessionLocal
+    from sqlalchemy import func, select
+
+    from app.models import Donation
+
+    responses = [
+        user_client.post(DONATION_URL, json={'full_amount': 600000})
+        for _ in range(2)
+    ]
+    assert [response.status_code for response in responses] == [202, 202], (
+        'В режиме отложенного распределения создание пожертвования '
+        'должно возвращать статус 202.'
+    )
+    async with TestingSessionLocal() as session:
+        invested = await session.scalar(select(func.sum(
+            Donation.invested_amount
+        )))
+        assert invested == 0, (
+            'До обработки очереди средства не должны распределяться.'
+        )
+
+    await deferred_invest.drain()
+
+    assert charity_project.fully_invested, (
+        'Воркер должен распределить все накопившиеся пожертвования '
+        'за один проход.'
+    )
+    async with TestingSessionLocal() as session:
+        invested = await session.scalars(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )
+        assert invested.all() == [600000, 400000], (
+            'Пожертвования должны распределяться в порядке создания.'
+        )
+
+
+async def invested_donations():
+    from conftest import TestingSessionLocal
+    from sqlalchemy import select
+
+    from app.models import Donation
+
+    async with TestingSessionLocal() as session:
+        invested = await session.scalars(
+            select(Donation.invested_amount).order_by(Donation.id)
+        )
+        return invested.all()
+
+
+@pytest.mark.usefixtures('charity_project', 'donation')
+async def test_deferred_recovery_settles_unqueued_items(deferred_invest):
+    deferred_invest.wake()
+    await deferred_invest.drain()
+
+    assert await invested_donations() == [100], (
+        'При запуске очередь должна распределить объекты, сохранённые '
+        'до перезапуска.'
+    )
+
+
+@pytest.mark.usefixtures('charity_project', 'donation')
+async def test_deferred_worker_retries_failed_pass(
+        monkeypatch, deferred_invest
+):
+    import asyncio
+
+    from app.services import invest_queue as invest_queue_module
+
+    monkeypatch.setattr(invest_queue_module, 'INVEST_QUEUE_RETRY_DELAY', 0)
+    process = deferred_invest.process
+    calls = []
+
+    async def failing_once():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError('БД недоступна')
+        await process()
+
+    monkeypatch.setattr(deferred_invest, 'process', failing_once)
+    deferred_invest.wake()
+    deferred_invest.start()
+    # Время заморожено фикстурами, поэтому ждём без таймеров.
+    for _ in range(1000):
+        if len(calls) >= 2 and not deferred_invest.pending.is_set():
+            break
+        await asyncio.sleep(0)
+    await deferred_invest.stop()
+
+    assert len(calls) >= 2, (
+        'После ошибки проход должен повториться.'
+    )
+    assert await invested_donations() == [100]
+
+
+REBALANCE_URL = PROJECTS_URL + 'rebalance'
+
+
+@pytest.fixture
+def small_project(freezer, make_project):
+    freezer.move_to('2009-09-09')
+    return make_project(
+        name='small', description='Small project', full_amount=50
+    )
+
+
+def test_rebalance_merges_open_items(
+        superuser_client, charity_project_little_invested, small_project,
+        donation, another_donation
+):
+    response = superuser_client.post(REBALANCE_URL)
+    assert response.status_code == 200, (
+        'Суперпользователь должен иметь возможность '
+        f'вызвать `{REBALANCE_URL}`.'
+    )
+    assert response.json() == {
+        'donations': 2,
+        'projects': 2,
+        'closed_donations': 2,
+        'closed_projects': 1,
+    }, 'Ответ должен описывать затронутые и закрытые объекты.'
+    assert small_project.fully_invested
+    assert charity_project_little_invested.invested_amount == 100 + 2050, (
+        'Остаток пожертвований должен уйти в следующий по дате проект.'
+    )
+
+
+def test_rebalance_forbidden_for_user(user_client):
+    response = user_client.post(REBALANCE_URL)
+    assert response.status_code == 403, (
+        f'`{REBALANCE_URL}` должен быть доступен только суперпользователю.'
+    )
+
+
+@pytest.mark.parametrize('engine', ['orm', 'sql'])
+async def test_closed_project_recorded_in_completion(
+        monkeypatch, engine, user_client, charity_project
+):
+    from sqlalchemy import select
+
+    from conftest import TestingSessionLocal
+
+    from app.core.config import settings
+    from app.models import ProjectCompletion
+
+    monkeypatch.setattr(settings, 'invest_engine', engine)
+    user_client.post(DONATION_URL, json={'full_amount': 400000})
+    user_client.post(DONATION_URL, json={'full_amount': 600000})
+
+    async with TestingSessionLocal() as session:
+        completions = (await session.execute(
+            select(ProjectCompletion)
+        )).scalars().all()
+    assert [c.project_id for c in completions] == [charity_project.id], (
+        'При закрытии проекта должна появляться одна строка '
+        'в project_completion.'
+    )
+    completion, = completions
+    assert completion.close_date == charity_project.close_date
+    assert completion.duration_seconds == round((
+        charity_project.close_date - charity_project.create_date
+    ).total_seconds())
+
+
+@pytest.fixture
+def statements():
+    """SQL-запросы, которые приложение отправляет в тестовую БД."""
+
+    from sqlalchemy import event
+
+    from conftest import engine
+
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine.sync_engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def production_sessions():
+    """
+    Сессии запросов с настройками AsyncSessionLocal (autoflush и т.д.),
+    но на тестовой БД. Указывается после фикстуры клиента,
+    чтобы заменить её подмену сессии.
+    """
+
+    from sqlalchemy.orm import sessionmaker
+
+    from conftest import app, engine, get_async_session
+
+    from app.core.db import AsyncSessionLocal
+
+    session_factory = sessionmaker(
+        class_=AsyncSessionLocal.class_,
+        **{**AsyncSessionLocal.kw, 'bind': engine}
+    )
+    assert session_factory.kw['autoflush'] is not False
+
+    async def production_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = production_db
+
+
+def kinds(statements: list[str]) -> list[str]:
+    return [statement.split(maxsplit=1)[0] for statement in statements]
+
+
+def updated_columns(statement: str) -> list[str]:
+    """Колонки из SET-части UPDATE."""
+
+    set_clause = statement.split(' SET ', 1)[1].split(' WHERE ')[0]
+    return [
+        assignment.split('=')[0] for assignment in set_clause.split(', ')
+    ]
+
+
+@pytest.mark.usefixtures('charity_project')
+def test_create_donation_statements(
+        user_client, production_sessions, statements
+):
+    response = user_client.post(DONATION_URL, json={'full_amount': 10})
+    assert response.status_code == 200
+    assert response.json()['id'] is not None
+    assert kinds(statements) == ['SELECT', 'UPDATE', 'INSERT'], (
+        'Создание пожертвования должно выбрать открытые проекты, '
+        'обновить проект и вставить пожертвование без повторного SELECT.'
+    )
+
+
+def test_create_and_update_project_statements(
+        superuser_client, production_sessions, statements
+):
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas',
+        'full_amount': 100,
+    })
+    assert response.status_code == 200
+    assert kinds(statements) == ['SELECT', 'SELECT', 'INSERT'], (
+        'Создание проекта должно проверить имя, выбрать открытые '
+        'пожертвования и вставить проект без повторного SELECT.'
+    )
+
+    statements.clear()
+    response = superuser_client.patch(
+        f'{PROJECTS_URL}{response.json()["id"]}',
+        json={'full_amount': 200}
+    )
+    assert response.json()['full_amount'] == 200
+    assert kinds(statements) == ['SELECT', 'UPDATE'], (
+        'Обновление проекта должно загрузить проект и обновить его '
+        'без повторного SELECT.'
+    )
+    assert updated_columns(statements[-1]) == ['full_amount', 'version'], (
+        'UPDATE должен менять только переданные поля и версию.'
+    )
+
+    statements.clear()
+    superuser_client.patch(
+        f'{PROJECTS_URL}{response.json()["id"]}',
+        json={'full_amount': 200, 'description': 'Huge fan of chimichangas'}
+    )
+    assert kinds(statements) == ['SELECT'], (
+        'Если значения не изменились, UPDATE отправляться не должен.'
+    )
+
+
+@pytest.mark.usefixtures('charity_project')
+def test_update_skips_unchanged_fields(
+        superuser_client, production_sessions, statements
+):
+    from app.crud.base import column_names
+    from app.models import CharityProject
+
+    response = superuser_client.patch(PROJECTS_URL + '1', json={
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 2000000,
+    })
+    assert response.status_code == 200, response.text
+    assert kinds(statements)[-1] == 'UPDATE'
+    assert updated_columns(statements[-1]) == ['full_amount', 'version'], (
+        'Поля, значения которых не изменились, не должны попадать в UPDATE.'
+    )
+    hits = column_names.cache_info().hits
+    column_names(CharityProject)
+    assert column_names.cache_info().hits == hits + 1, (
+        'Имена колонок модели должны вычисляться один раз.'
+    )
@@ -0,0 +1,143 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services import export
+
+REPORTS_URL = '/reports/closed_projects'
+
+
+@pytest.fixture
+def closed_projects(make_closed_project):
+    for name, created, closed in [('slow', 1, 9), ('fast', 3, 4)]:
+        make_closed_project(
+            name, datetime(2010, 10, created), datetime(2010, 10, closed),
+            description=f'{name} project'
+        )
+
+
+@pytest.fixture
+def report_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'report_dir', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.usefixtures('closed_projects')
+def test_closed_projects_csv_stream(superuser_client):
+    response = superuser_client.get(REPORTS_URL, params={'top': 5})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == export.EXPORT_HEADER
+    assert [row[0] for row in rows[1:]] == ['fast', 'slow'], (
+        'CSV-отчёт должен быть отсортирован по скорости сбора.'
+    )
+    assert rows[1][1:] == ['1 day, 0:00:0.000000', 'fast project', '86400']
+
+
+def test_closed_projects_csv_forbidden_for_user(user_client):
+    assert user_client.get(REPORTS_URL).status_code == 403
+
+
+@pytest.mark.usefixtures('closed_projects')
+def test_closed_projects_file_export(superuser_client, report_dir):
+    response = superuser_client.post(
+        REPORTS_URL, params={'file_format': 'csv', 'top': 1}
+    )
+    assert response.status_code == 202, response.text
+    data = response.json()
+    assert [path.name for path in report_dir.iterdir()] == [
+        data['file_name']
+    ], 'Файл должен записываться в REPORT_DIR без временных остатков.'
+
+    downloaded = superuser_client.get(data['url'])
+    assert downloaded.status_code == 200
+    rows = list(csv.reader(io.StringIO(downloaded.text)))
+    assert [row[0] for row in rows] == [export.EXPORT_HEADER[0], 'fast']
+
+
+def read_xlsx(content: bytes) -> list[list]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True)
+    return [list(row) for row in workbook.worksheets[0].values]
+
+
+def read_parquet(content: bytes) -> list[list]:
+    import pyarrow.parquet
+
+    table = pyarrow.parquet.read_table(io.BytesIO(content))
+    return [
+        table.column_names,
+        *(list(row) for row in zip(*table.to_pydict().values()))
+    ]
+
+
+@pytest.mark.parametrize('file_format, read_rows, header', [
+    ('xlsx', read_xlsx, export.EXPORT_HEADER),
+    ('parquet', read_parquet, export.PARQUET_COLUMNS),
+])
+@pytest.mark.usefixtures('closed_projects')
+def test_closed_projects_binary_export(
+        superuser_client, report_dir, file_format, read_rows, header
+):
+    data = superuser_client.post(
+        REPORTS_URL, params={'file_format': file_format}
+    ).json()
+    downloaded = superuser_client.get(data['url'])
+    assert downloaded.status_code == 200, downloaded.text
+
+    rows = read_rows(downloaded.content)
+    assert rows[0] == header
+    assert rows[1:] == [
+        ['fast', '1 day, 0:00:0.000000', 'fast project', 86400],
+        ['slow', '8 days, 0:00:0.000000', 'slow project', 8 * 86400],
+    ], f'Выгрузка {file_format} должна читаться с теми же строками.'
+
+
+def test_missing_export_library(monkeypatch, superuser_client, report_dir):
+    monkeypatch.setattr(export, 'find_spec', lambda name: None)
+    response = superuser_client.post(
+        REPORTS_URL, params={'file_format': 'parquet'}
+    )
+    assert response.status_code == 501, (
+        'Без pyarrow выгрузка в Parquet должна сообщать об ошибке.'
+    )
+    assert list(report_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize('file_name', ['missing.csv', '..%2Ftest.db'])
+def test_download_unknown_report(superuser_client, report_dir, file_name):
+    assert superuser_client.get(
+        f'{REPORTS_URL}/{file_name}'
+    ).status_code == 404
+
+
+def test_partial_report_not_downloadable(superuser_client, report_dir):
+    (report_dir / 'closed_projects.csv.part').write_text('name\nhalf')
+    assert superuser_client.get(
+        f'{REPORTS_URL}/closed_projects.csv.part'
+    ).status_code == 404, 'Недописанный файл выгрузки не должен отдаваться.'
+
+
+@pytest.mark.usefixtures('closed_projects')
+def test_failed_export_reported_on_download(
+        monkeypatch, superuser_client, report_dir
+):
+    def broken_write(self, rows):
+        raise OSError('Диск переполнен')
+
+    monkeypatch.setattr(export.CsvExport, 'write', broken_write)
+    data = superuser_client.post(
+        REPORTS_URL, params={'file_format': 'csv'}
+    ).json()
+
+    response = superuser_client.get(data['url'])
+    assert response.status_code == 404
+    assert 'Диск переполнен' in response.json()['detail'], (
+        'При скачивании должна сообщаться ошибка неудавшейся выгрузки.'
+    )
+    assert not (report_dir / f"{data['file_name']}.part").exists()